@@ -0,0 +1,55 @@
+"""Bytes on the wire between the extension and a stand-in dispatcher with each request encoding.
+
+Runs an invocation that echoes a JSON input of ``--records`` records, and reports the size of the /operator body a
+dispatcher would send and of the node_finished body the extension posts back.
+
+    python benchmarks/compression.py --records 5000
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import time
+
+import oloren as olo
+from oloren import server
+
+from stand_ins import Dispatcher
+
+
+@olo.register()
+def echo(a=olo.Json()):
+    return a
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--records", type=int, default=5000)
+    args = parser.parse_args()
+
+    dispatcher = Dispatcher()
+    records = [{"id": i, "smiles": "CC(=O)OC1=CC=CC=C1C(=O)O", "score": i / args.records} for i in range(args.records)]
+    body = {"node": {"token": None, "data": [{"value": records}]}, "inputs": [], "id": "n1", "uuid": "u1"}
+    operator_body = json.dumps(body).encode()
+
+    encodings = [None, "gzip"] + (["zstd"] if server.zstandard is not None else [])
+    print(f"{'encoding':>9} {'/operator':>10} {'node_finished':>14} {'run time':>10}")
+    for encoding in encodings:
+        server._session = server.DispatcherSession(request_encoding=encoding)
+        server._session_pid = os.getpid()
+        dispatcher.posts.clear()
+
+        start = time.perf_counter()
+        # execute_function logs every invocation
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            server.execute_function(dispatcher.url, body, "echo")
+        elapsed = time.perf_counter() - start
+
+        sent = sum(size for path, _, size in dispatcher.posts if path == "/node_finished")
+        received = len(operator_body) if encoding is None else len(server.compress(operator_body, encoding))
+        print(f"{encoding or 'identity':>9} {received:>10} {sent:>14} {elapsed * 1e3:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Per-invocation overhead of turning raw inputs into function arguments and detecting batch mode.
+
+"before" is the previous loop in execute_function, which looked each argument's type up in FUNCTIONS and compared type
+names for every input, then scanned all inputs twice for batches. "after" applies the decoders register compiled.
+
+    python benchmarks/decoding.py
+"""
+
+import copy
+from functools import partial
+
+import oloren as olo
+from oloren import server
+from oloren.types import NULL_VALUE
+
+from stand_ins import best_of
+
+
+@olo.register()
+def many_args(
+    a=olo.Num(),
+    b=olo.String(),
+    c=olo.Option(olo.Bool()),
+    d=olo.Option(olo.Num(), default=5),
+    e=olo.Json(),
+    f=olo.Func(),
+    g=olo.Num(),
+    h=olo.String(),
+):
+    pass
+
+
+GRAPH = {"id": "graph", "operator": "graph", "data": [], "input_ids": [], "output_ids": [{"id": 1}]}
+INPUTS = [1, "x", NULL_VALUE, NULL_VALUE, {"k": [1, 2, 3]}, GRAPH, 2, "y"]
+
+
+def run_graph(*args, graph=None):
+    pass
+
+
+def before(FUNCTION_NAME, inputs):
+    inputs = list(inputs)
+    for i, input in enumerate(inputs):
+        if server.FUNCTIONS[FUNCTION_NAME][1].args[i].type == "File":
+            pass
+        elif server.FUNCTIONS[FUNCTION_NAME][1].args[i].type == "Dir":
+            pass
+        elif server.FUNCTIONS[FUNCTION_NAME][1].args[i].type == "Func":
+            inputs[i] = partial(run_graph, graph=copy.deepcopy(inputs[i]))
+        elif server.FUNCTIONS[FUNCTION_NAME][1].args[i].type == "Funcs":
+            inputs[i] = {j: partial(run_graph, graph=g) for j, g in enumerate(copy.deepcopy(inputs[i]))}
+        if input == NULL_VALUE:
+            if (
+                server.FUNCTIONS[FUNCTION_NAME][1].args[i].type == "Option"
+                and server.FUNCTIONS[FUNCTION_NAME][1].args[i].ty._type == "Bool"
+                and server.FUNCTIONS[FUNCTION_NAME][1].args[i].default is None
+            ):
+                inputs[i] = False
+            else:
+                inputs[i] = server.FUNCTIONS[FUNCTION_NAME][1].args[i].default
+    batched = [
+        inputs[i][0] == server._RESERVED_BATCH_KEY if type(inputs[i]) == list and len(inputs[i]) > 0 else 0
+        for i in range(len(inputs))
+    ]
+    return len(inputs) > 0 and sum(batched) == 1, len(inputs) > 0 and sum(batched) == len(inputs)
+
+
+def after(FUNCTION_NAME, inputs):
+    decoders = server.FUNCTIONS[FUNCTION_NAME][0].decoders
+    context = server.DecodeContext({}, run_graph)
+    inputs = [decoders[i](i, input, context) for i, input in enumerate(inputs)]
+    batch_positions = [
+        i
+        for i, input in enumerate(inputs)
+        if type(input) == list and len(input) > 0 and input[0] == server._RESERVED_BATCH_KEY
+    ]
+    return len(batch_positions) == 1, len(inputs) > 0 and len(batch_positions) == len(inputs)
+
+
+def main():
+    assert before("many_args", INPUTS) == after("many_args", INPUTS)
+    timings = [best_of(lambda: decode("many_args", INPUTS), number=20000) for decode in (before, after)]
+    print(f"before: {timings[0] * 1e6:6.2f}us per invocation")
+    print(f" after: {timings[1] * 1e6:6.2f}us per invocation ({timings[0] / timings[1]:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Download throughput of File inputs: a single streamed GET with 8 KB chunks, as before, against ranged parallel
+downloads, for one large object and for several objects fetched concurrently by execute_function.
+
+The stand-in file server limits each response to ``--stream-mbps``, like the per-connection throughput of S3.
+
+    python benchmarks/downloads.py --size-mb 256 --stream-mbps 100
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from oloren import server
+
+from stand_ins import FileServer
+
+
+def single_stream(signed_url):
+    with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
+        response = requests.get(signed_url, stream=True)
+        for chunk in response.iter_content(chunk_size=8192):
+            tmp_file.write(chunk)
+    return tmp_file.name
+
+
+def timed(download, urls, concurrently):
+    start = time.perf_counter()
+    if concurrently:
+        with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            paths = list(executor.map(download, urls))
+    else:
+        paths = [download(url) for url in urls]
+    elapsed = time.perf_counter() - start
+    for path in paths:
+        os.remove(path)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--inputs", type=int, default=3, help="number of File inputs for the multi-input case")
+    parser.add_argument("--stream-mbps", type=float, default=100)
+    args = parser.parse_args()
+
+    data = os.urandom(args.size_mb * 1024 * 1024)
+    file_server = FileServer(data, stream_mbps=args.stream_mbps)
+    urls = [f"{file_server.url}/{i}" for i in range(args.inputs)]
+
+    cases = [
+        ("single stream, 1 object", single_stream, urls[:1], False),
+        ("ranged, 1 object", server.download_from_signed_url, urls[:1], False),
+        (f"single stream, {args.inputs} objects in turn", single_stream, urls, False),
+        (f"ranged, {args.inputs} objects at once", server.download_from_signed_url, urls, True),
+    ]
+    for name, download, case_urls, concurrently in cases:
+        elapsed = timed(download, case_urls, concurrently)
+        megabytes = args.size_mb * len(case_urls)
+        print(f"{name:>34}: {elapsed:6.2f}s, {megabytes / elapsed:7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Time to build the /run_graph payload for one call of an olo.Func, over graph sizes.
+
+"before" is the previous path: deepcopy the graph once per invocation, then on every call find the largest output id,
+round-trip the graph through json, and let requests encode it again. "after" builds a GraphTemplate on the first call
+and only renders it on later calls.
+
+    python benchmarks/graph_payload.py
+"""
+
+import copy
+import json
+import uuid
+
+from oloren import server
+
+from stand_ins import best_of
+
+
+def make_graph(nodes):
+    elements = [
+        {
+            "id": f"node-{i}",
+            "operator": "extension",
+            "data": [{"value": i}, {"value": "CC(=O)OC1=CC=CC=C1C(=O)O"}],
+            "input_ids": [{"id": i}],
+            "output_ids": [{"id": i + 1}],
+        }
+        for i in range(nodes)
+    ]
+    return {"id": "graph", "operator": "graph", "data": elements, "input_ids": [], "output_ids": [{"id": nodes}]}
+
+
+def previous_payload(graph, inputs):
+    max_id = max([output_id["id"] for output_id in graph["output_ids"]]) + 1
+    uid = str(uuid.uuid4())
+    new_elements = [
+        {
+            "id": f"{uid}-input-{idx}",
+            "data": inp,
+            "operator": "extractdata",
+            "input_ids": [],
+            "output_ids": [{"id": max_id + idx}],
+        }
+        for idx, inp in enumerate(inputs)
+    ]
+    new_graph = json.loads(json.dumps([graph] + new_elements))
+    new_graph[0]["id"] = f"{uid}-graph"
+    new_graph[0]["input_ids"] = [el["output_ids"][0] for el in new_elements]
+    return json.dumps({"graph": new_graph}).encode()
+
+
+def main():
+    inputs = ["CC(=O)OC1=CC=CC=C1C(=O)O", 0.5]
+    print(f"{'':>6} {'first call':^32} {'later calls':^32}")
+    print(f"{'nodes':>6}" + f" {'before':>10} {'after':>10} {'speedup':>9}" * 2)
+    for nodes in [10, 100, 1000, 10000]:
+        graph = make_graph(nodes)
+        template = server.GraphTemplate(graph)
+        number = max(1, 20000 // nodes)
+        timings = [
+            best_of(lambda: previous_payload(copy.deepcopy(graph), inputs), number=number),
+            best_of(lambda: server.GraphTemplate(graph).render(str(uuid.uuid4()), inputs), number=number),
+            best_of(lambda: previous_payload(graph, inputs), number=number),
+            best_of(lambda: template.render(str(uuid.uuid4()), inputs), number=number),
+        ]
+        row = f"{nodes:>6}"
+        for before, after in [timings[:2], timings[2:]]:
+            row += f" {before * 1e6:>8.0f}us {after * 1e6:>8.0f}us {before / after:>8.1f}x"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
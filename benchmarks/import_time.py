@@ -0,0 +1,54 @@
+"""Cold start of ``import oloren``, measured with ``python -X importtime`` in fresh interpreters.
+
+The Lambda and job paths only import oloren, while serving also loads the Flask app on first use of ``oloren.app``.
+Prints the median cumulative import time of each and whether the HTTP server modules were loaded.
+
+    python benchmarks/import_time.py --runs 10
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+CASES = {
+    "import oloren": "import oloren",
+    "import oloren; oloren.app": "import oloren; oloren.app",
+}
+
+HEAVY = ["flask", "flask_cors", "werkzeug", "socketio", "engineio", "asyncio", "multiprocessing"]
+
+
+def import_times(code):
+    """Returns the cumulative import time in microseconds of every module ``code`` imports, and of just the top-level
+    ones."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+    times, top_level = {}, {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)", line)
+        if match:
+            times[match[3]] = int(match[1])
+            if match[2] == "":
+                top_level[match[3]] = int(match[1])
+    return times, top_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    for name, code in CASES.items():
+        runs = [import_times(code) for _ in range(args.runs)]
+        total = statistics.median(sum(top_level.values()) for _, top_level in runs)
+        oloren = statistics.median(top_level.get("oloren", 0) for _, top_level in runs)
+        loaded = [module for module in HEAVY if any(module in times for times, _ in runs)]
+        print(f"{name:>26}: {total / 1e3:6.1f}ms in total, {oloren / 1e3:6.1f}ms in oloren")
+        print(f"{'':>26}  loads {', '.join(loaded) or 'none of ' + ', '.join(HEAVY)}")
+
+
+if __name__ == "__main__":
+    main()
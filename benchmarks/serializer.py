@@ -0,0 +1,55 @@
+"""Encoding time of large outputs with the json module, as before, against the serializer olo.set_serializer configures.
+
+"before" encodes the node_finished body the way requests did for ``json=``. NumPy outputs are included when NumPy is
+installed, converted with ``tolist()`` for "before" since the json module can't encode them.
+
+    python benchmarks/serializer.py
+"""
+
+import json
+import random
+
+from oloren import serialize
+
+from stand_ins import best_of
+
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+
+def payloads():
+    rows = [
+        {"id": i, "smiles": "CC(=O)OC1=CC=CC=C1C(=O)O", "score": random.random(), "tags": ["a", "b"]}
+        for i in range(100000)
+    ]
+    yield "100k floats", [random.random() for _ in range(100000)]
+    yield "100k records", rows
+    yield "nested dict", {str(i): {"values": list(range(100)), "name": f"item {i}"} for i in range(5000)}
+    if numpy is not None:
+        array = numpy.random.rand(1000, 100)
+        yield "1000x100 array", array
+
+
+def before(value):
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        value = value.tolist()
+    return json.dumps({"node": "n1", "output": [value]}, allow_nan=False).encode()
+
+
+def after(value):
+    return b'{"node": "n1", "output": [' + serialize.dumps(value) + b"]}"
+
+
+def main():
+    print(f"serializer: {'orjson' if serialize.orjson is not None else 'json'}")
+    for name, value in payloads():
+        timings = [best_of(lambda: encode(value), repeat=3) for encode in (before, after)]
+        speedup = timings[0] / timings[1]
+        print(f"{name:>14}: before {timings[0] * 1e3:7.1f}ms, after {timings[1] * 1e3:7.1f}ms, {speedup:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Load test of the Werkzeug development server, which olo.run used before, against server_mode="production".
+
+Each server runs in its own process, and ``--clients`` threads send ``--requests`` GET /directory requests in total over
+keep-alive connections.
+
+    python benchmarks/serving.py --clients 32 --requests 5000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+APP = """
+import sys
+import oloren as olo
+from oloren import wsgi
+
+@olo.register()
+def hello():
+    return "Hello World!"
+
+port = int(sys.argv[1])
+if sys.argv[2] == "dev":
+    wsgi.prepare_responses()
+    wsgi.app.run(host="127.0.0.1", port=port, threaded=True)
+else:
+    olo.run("benchmark", port=port, server_mode="production", threads=int(sys.argv[3]))
+"""
+
+
+def wait_until_up(url, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The server exited before it started serving")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise TimeoutError(f"{url} did not come up")
+
+
+def load(url, clients, total):
+    def client(n):
+        latencies = []
+        with requests.Session() as session:
+            for _ in range(n):
+                start = time.perf_counter()
+                response = session.get(url)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        latencies = [latency for result in executor.map(client, [total // clients] * clients) for latency in result]
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=16, help="threads of the production server")
+    parser.add_argument("--port", type=int, default=4899)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}/directory"
+    for mode in ["dev", "production"]:
+        process = subprocess.Popen(
+            [sys.executable, "-c", APP, str(args.port), mode, str(args.threads)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env={**os.environ, "MODE": ""},
+        )
+        try:
+            wait_until_up(url, process)
+            throughput, p50, p99 = load(url, args.clients, args.requests)
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{mode:>10}: {throughput:7.0f} requests/s, p50 {p50 * 1e3:6.1f}ms, p99 {p99 * 1e3:6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
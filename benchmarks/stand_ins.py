@@ -0,0 +1,110 @@
+"""Local HTTP servers that stand in for the dispatcher and for file storage in the benchmarks."""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+import re
+
+
+class Dispatcher(ThreadingHTTPServer):
+    """Answers every POST with 200 and records its path, headers and body size."""
+
+    request_queue_size = 256
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), DispatcherHandler)
+        self.posts = []
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, path):
+        with self.lock:
+            return sum(1 for post in self.posts if post[0] == path)
+
+    def wait_for(self, path, n, timeout=300):
+        deadline = time.time() + timeout
+        while self.count(path) < n:
+            if time.time() > deadline:
+                raise TimeoutError(f"Only {self.count(path)} of {n} posts to {path} arrived")
+            time.sleep(0.001)
+
+
+class DispatcherHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with self.server.lock:
+            self.server.posts.append((self.path, dict(self.headers), len(body)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "4")
+        self.end_headers()
+        self.wfile.write(b'"ok"')
+
+    def log_message(self, *args):
+        pass
+
+
+class FileServer(ThreadingHTTPServer):
+    """Serves ``data`` at any path, honouring single byte ranges, with each response limited to ``stream_mbps``
+    megabytes per second to mimic the per-connection throughput of object storage."""
+
+    daemon_threads = True
+
+    def __init__(self, data, stream_mbps=None):
+        super().__init__(("127.0.0.1", 0), FileHandler)
+        self.data = data
+        self.stream_mbps = stream_mbps
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/object"
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        data = self.server.data
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match[1])
+            end = min(int(match[2]) if match[2] else len(data) - 1, len(data) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            body = memoryview(data)[start : end + 1]
+        else:
+            self.send_response(200)
+            body = memoryview(data)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        chunk_size = 256 * 1024
+        started = time.time()
+        for offset in range(0, len(body), chunk_size):
+            self.wfile.write(body[offset : offset + chunk_size])
+            if self.server.stream_mbps:
+                ahead = (offset + chunk_size) / (self.server.stream_mbps * 1e6) - (time.time() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def log_message(self, *args):
+        pass
+
+
+def best_of(fn, repeat=5, number=1):
+    """Returns the fastest of ``repeat`` timings of ``number`` calls to ``fn``, in seconds per call."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings)
@@ -0,0 +1,63 @@
+"""Invocation throughput of a process per invocation against a pool of long-lived workers (olo.run(workers=N)).
+
+Each invocation is submitted the way the /operator route does and counts as done once its node_finished reaches a
+stand-in dispatcher. ``--heap-mb`` grows the parent process first, as heavy libraries like pandas or torch would, which
+makes every fork more expensive.
+
+    python benchmarks/worker_pool.py --invocations 200 --workers 4 --heap-mb 500
+"""
+
+import argparse
+import contextlib
+import os
+import time
+
+import oloren as olo
+from oloren import server
+
+from stand_ins import Dispatcher
+
+
+@olo.register()
+def add(a=olo.Num(), b=olo.Num()):
+    return a + b
+
+
+def run(dispatcher, invocations, workers):
+    server.worker_pool.configure(workers)
+    before = dispatcher.count("/node_finished")
+    start = time.perf_counter()
+    for i in range(invocations):
+        body = {
+            "node": {"token": None, "data": [{"value": i}, {"value": 1}]},
+            "inputs": [],
+            "id": f"n{i}",
+            "uuid": f"u{i}",
+        }
+        server.worker_pool.submit(server.execute_function, dispatcher.url, body, "add")
+    dispatcher.wait_for("/node_finished", before + invocations)
+    elapsed = time.perf_counter() - start
+    server.worker_pool.shutdown(wait=True)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--invocations", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--heap-mb", type=int, default=0)
+    args = parser.parse_args()
+
+    # Written to, so the pages are really allocated
+    heap = [bytearray(b"x" * 1024 * 1024) for _ in range(args.heap_mb)]  # noqa: F841
+    dispatcher = Dispatcher()
+
+    for name, workers in [("process per invocation", None), (f"pool of {args.workers} workers", args.workers)]:
+        # execute_function logs every invocation
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            elapsed = run(dispatcher, args.invocations, workers)
+        print(f"{name:>24}: {elapsed:6.2f}s, {args.invocations / elapsed:7.1f} invocations/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,8 @@ module.exports = {
   },
   output: {
     publicPath: "auto",
+    // hashed chunk names let the extension server cache them indefinitely
+    chunkFilename: "[name].[contenthash].js",
   },
   resolve: {
     extensions: [".ts", ".tsx", ".js"],
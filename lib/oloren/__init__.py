@@ -1,4 +1,14 @@
 from .server import *
 from .types import *
 from .util import *
-from .client import *
\ No newline at end of file
+from .client import *
+from .serialize import *
+
+
+def __getattr__(name):
+    # The Flask app is only needed to serve HTTP, so Lambda and job runs never import Flask
+    if name == "app":
+        from .wsgi import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,321 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+from . import serialize
+from .util import OutputFile
+
+
+# Fields of a file record that identify its content, in order of preference. Signed URLs expire, so they are only used
+# (without their query string) when none of these are present.
+_IDENTITY_FIELDS = ("etag", "ETag", "hash", "sha256", "md5", "key", "Key", "path", "bucket", "Bucket")
+
+
+def file_record_key(record):
+    """Returns a stable cache key for a file record, ignoring the expiring parts of its signed URL."""
+    identity = {field: record[field] for field in _IDENTITY_FIELDS if record.get(field)}
+    if len(identity) == 0:
+        url = urlsplit(record["url"])
+        identity = {"url": url.netloc + url.path}
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+
+def tree_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def link_tree(src):
+    """Recreates the directory ``src`` at a fresh temporary path with every file hardlinked (or copied)."""
+    dst = tempfile.mkdtemp()
+    os.rmdir(dst)
+    try:
+        shutil.copytree(src, dst, copy_function=link_or_copy)
+    except BaseException:
+        shutil.rmtree(dst, ignore_errors=True)
+        raise
+    return dst
+
+
+def link_or_copy(src, dst=None):
+    """Hardlinks ``src`` to ``dst`` (a fresh temporary path by default), copying if linking isn't possible."""
+    if dst is None:
+        fd, dst = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+    return dst
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+class FileCache:
+    """On-disk LRU cache of downloaded files and extracted directories, shared by every process that points at the same
+    directory.
+
+    Entries are written to a temporary path and renamed into place, so concurrent workers never see partial files.
+    Reads refresh an entry's mtime, and inserts evict the least recently used entries until the cache fits
+    ``max_bytes``.
+
+    Args:
+        directory (str): Where cached files are stored.
+        max_bytes (int): Size budget for the cache. Defaults to 10 GiB.
+    """
+
+    def __init__(self, directory, max_bytes=10 * 1024**3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Creates a cache from ``OLOREN_FILE_CACHE_DIR`` and ``OLOREN_FILE_CACHE_SIZE`` (bytes), or None if unset."""
+        directory = os.getenv("OLOREN_FILE_CACHE_DIR")
+        if not directory:
+            return None
+        max_bytes = os.getenv("OLOREN_FILE_CACHE_SIZE")
+        return cls(directory, int(max_bytes)) if max_bytes else cls(directory)
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Returns the cached path for ``key``, or None on a miss."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, fill, directory=False):
+        """Stores the file (or directory) written by ``fill(path)`` under ``key`` and returns its cached path."""
+        if directory:
+            tmp_path = tempfile.mkdtemp(dir=self.directory, prefix=".partial-")
+        else:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".partial-")
+            os.close(fd)
+        try:
+            fill(tmp_path)
+            try:
+                os.replace(tmp_path, self.path(key))
+            except OSError:
+                # Another worker cached the same directory first, keep theirs
+                if not (directory and os.path.isdir(self.path(key))):
+                    raise
+                shutil.rmtree(tmp_path)
+        except BaseException:
+            _remove(tmp_path)
+            raise
+        self.evict(keep=key)
+        return self.path(key)
+
+    def get_or_put(self, key, fill, directory=False):
+        path = self.get(key)
+        if path is not None:
+            return path
+        return self.put(key, fill, directory=directory)
+
+    def evict(self, keep=None):
+        """Removes the least recently used entries until the cache fits its budget, never removing ``keep``.
+
+        An entry larger than the whole budget is kept until the next insert, so the caller can still link it.
+        """
+        with self.lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.startswith(".partial-"):
+                    continue
+                try:
+                    entries.append((entry.stat().st_mtime, tree_size(entry.path), entry.path))
+                except FileNotFoundError:
+                    continue
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if keep is not None and path == self.path(keep):
+                    continue
+                _remove(path)
+                total -= size
+
+
+def hash_path(path):
+    """Returns a sha256 of the contents of a file, or of every file name and content under a directory."""
+    digest = hashlib.sha256()
+    paths = [path]
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(root, name) for root, _, files in os.walk(path) for name in files)
+    for file_path in paths:
+        digest.update(os.path.relpath(file_path, path).encode())
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Memoizes function outputs in an in-memory LRU, optionally backed by a FileCache on disk.
+
+    Only outputs the serializer can encode are stored, and they come back as it decodes them, e.g. NumPy arrays as
+    lists. The in-memory LRU lives in the worker process, so it is only shared between invocations when running with a
+    worker pool, the disk store is shared by every process.
+
+    Args:
+        max_entries (int): The number of results kept in memory. Defaults to 128.
+        ttl (Optional[float]): Seconds after which a result expires. Defaults to None (never).
+        directory (Optional[str]): Directory for the on-disk store. Defaults to None (memory only).
+        max_bytes (int): Size budget for the on-disk store. Defaults to 1 GiB.
+    """
+
+    def __init__(self, max_entries=128, ttl=None, directory=None, max_bytes=1024**3):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.memory = OrderedDict()
+        self.disk = FileCache(directory, max_bytes) if directory is not None else None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def get(self, key):
+        """Returns ``(True, outputs)`` on a hit and ``(False, None)`` on a miss."""
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self.memory[key]
+                entry = None
+            if entry is not None:
+                self.memory.move_to_end(key)
+
+        if entry is None and self.disk is not None:
+            path = self.disk.get(key)
+            if path is not None:
+                try:
+                    with open(path, "r") as file:
+                        entry = json.load(file)
+                except (OSError, ValueError):
+                    entry = None
+                if entry is not None and self._expired(entry[0]):
+                    entry = None
+                if entry is not None:
+                    self._remember(key, entry)
+
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+        return True, serialize.loads(entry[1])
+
+    def _remember(self, key, entry):
+        with self.lock:
+            self.memory[key] = entry
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    def put(self, key, outputs):
+        """Stores ``outputs`` under ``key``, returning False (and storing nothing) if they can't be encoded or include
+        output files, which have to be uploaded again on every call."""
+        if any(isinstance(output, (OutputFile, io.BytesIO)) for output in outputs):
+            return False
+        try:
+            entry = [time.time(), serialize.dumps(outputs).decode()]
+        except (TypeError, ValueError):
+            return False
+        self._remember(key, entry)
+        if self.disk is not None:
+
+            def fill(path):
+                with open(path, "w") as file:
+                    json.dump(entry, file)
+
+            self.disk.put(key, fill)
+        return True
+
+
+class GraphCache:
+    """An LRU of ``olo.Func`` graph call results, keyed by the graph and the call's arguments.
+
+    Concurrent calls with the same key wait for the first one rather than each running the graph. Failed calls are not
+    cached.
+
+    Args:
+        max_entries (int): The number of results kept. Defaults to 1024.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.results = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(graph_json, args):
+        """Hashes a graph, already serialized with sorted keys, together with the call's arguments."""
+        args_json = json.dumps(list(args), sort_keys=True, default=str)
+        return hashlib.sha256((graph_json + args_json).encode()).hexdigest()
+
+    def get_or_call(self, key, call):
+        with self.lock:
+            if key in self.results:
+                self.hits += 1
+                self.results.move_to_end(key)
+                return self.results[key]
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self.in_flight[key] = Future()
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = call()
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            del self.in_flight[key]
+            self.results[key] = result
+            while len(self.results) > self.max_entries:
+                self.results.popitem(last=False)
+        future.set_result(result)
+        return result
@@ -1,7 +1,7 @@
 from .server import *
+from .server import get_session
 
 from typing import Any
-import requests
 import uuid
 import json
 
@@ -33,7 +33,7 @@ class API:
         url = config["DISPATCHER_URL"] + "/api/run/" + self.appDb["name"]
 
         print("Launching app in session ", self.sessionId)
-        res = requests.post(url, headers=headers, json=data, timeout=600)
+        res = get_session().post(url, headers=headers, json=data, timeout=600)
 
         if res.status_code != 200:
             print(res.text)
@@ -57,7 +57,7 @@ class Client_:
         assert config["DISPATCHER_URL"] is not None, "Dispatcher URL not set, set with olo.config['DISPATCHER_URL'] = '...'"
         assert config["TOKEN"] is not None, "Token not set, set with olo.config['TOKEN'] = '...'"
         
-        self.apisList = requests.get(f"{config['DISPATCHER_URL']}/apps",
+        self.apisList = get_session().get(f"{config['DISPATCHER_URL']}/apps",
             headers={
                 "Authorization": f"Bearer {config['TOKEN']}"
             }
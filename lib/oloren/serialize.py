@@ -0,0 +1,89 @@
+import dataclasses
+import json
+
+from .util import OutputFile
+
+try:
+    import orjson
+
+except ImportError:
+    orjson = None
+
+
+def default(obj):
+    """Converts the values json can't encode natively: NumPy arrays and scalars, pandas objects, dates, sets and
+    dataclasses.
+
+    NumPy and pandas are recognized by their module, so neither is imported here. Output files are refused, they have
+    to be uploaded rather than encoded.
+    """
+    if isinstance(obj, OutputFile):
+        raise TypeError("Output files can't be encoded as JSON")
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    module = type(obj).__module__.split(".")[0]
+    if module == "pandas":
+        if hasattr(obj, "to_dict") and hasattr(obj, "columns"):
+            return obj.to_dict(orient="records")
+        if hasattr(obj, "tolist"):
+            return obj.tolist()
+        if hasattr(obj, "isoformat"):
+            return obj.isoformat()
+    if module == "numpy" and hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JSONSerializer:
+    """Encodes the JSON sent to the dispatcher, using orjson when it is installed and the json module otherwise.
+
+    Subclass this, or pass any object with the same ``dumps`` and ``loads`` methods, to ``olo.set_serializer`` to change
+    how outputs and graph inputs are encoded.
+    """
+
+    def __init__(self, default=default):
+        self.default = default
+
+    def dumps(self, obj):
+        """Returns ``obj`` encoded as UTF-8 JSON bytes."""
+        if orjson is not None:
+            try:
+                # Dataclasses go through default too, which refuses OutputFile
+                return orjson.dumps(
+                    obj,
+                    default=self.default,
+                    option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS,
+                )
+            except TypeError:
+                # e.g. integers over 64 bits, which the json module encodes fine
+                pass
+        return json.dumps(obj, default=self.default).encode()
+
+    def loads(self, data):
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+serializer = JSONSerializer()
+
+
+def set_serializer(new_serializer):
+    """Replaces the serializer for outputs and graph inputs, e.g. with a JSONSerializer that has its own ``default``."""
+    global serializer
+    serializer = new_serializer
+
+
+def dumps(obj):
+    return serializer.dumps(obj)
+
+
+def loads(data):
+    return serializer.loads(data)
+
+
+__all__ = ["JSONSerializer", "set_serializer"]
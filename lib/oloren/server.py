@@ -1,29 +1,41 @@
-from flask import Flask, Response, request, send_from_directory, jsonify, session
-from flask_cors import CORS
 import json
 import tempfile
 import time
 import uuid
 from .util import OutputFile
+from . import serialize
+from .cache import FileCache, GraphCache, ResultCache, file_record_key, hash_path, link_or_copy, link_tree
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit
 import traceback
 import threading
+import queue
 import io
 import os
-import copy
 import inspect
+import hashlib
+import gzip
 from dataclasses import asdict
 from .types import NULL_VALUE, Type, Config, Ty, Option
 from typing import Dict, Tuple, Callable, Union, List
 import subprocess
 import sys
 import zipfile
-import socketio
-import asyncio
+import shutil
 from functools import partial
+from collections import namedtuple
+import itertools
 
 from contextlib import contextmanager
 
+try:
+    import zstandard
+
+except ImportError:
+    zstandard = None
+
 config = {
     "DISPATCHER_URL": None,
     "TOKEN": None
@@ -43,11 +55,93 @@ def change_dir(destination):
         os.chdir(cwd)  # change back to original directory
 
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), "static"))
-app.secret_key = "catcocacolacatdog"
-CORS(app)
+STATIC_FOLDER = os.path.join(os.path.dirname(__file__), "static")
+
+HTTP_POOL_SIZE = int(os.getenv("OLOREN_HTTP_POOL_SIZE", "32"))
+HTTP_TIMEOUT = (10, 300)  # (connect, read) seconds
+HTTP_RETRIES = 3
+
+# Set OLOREN_REQUEST_ENCODING to "gzip" or "zstd" to compress request bodies to the dispatcher over COMPRESS_MIN_SIZE
+REQUEST_ENCODING = os.getenv("OLOREN_REQUEST_ENCODING") or None
+COMPRESS_MIN_SIZE = 1024
+
+
+def compress(data, encoding):
+    """Compresses ``data`` with a Content-Encoding, "gzip" or "zstd"."""
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=5)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    raise ValueError(f"Unsupported encoding {encoding!r}.")
+
+
+class DispatcherSession(requests.Session):
+    """A requests session with a default timeout, used for all traffic to the dispatcher and file storage."""
+
+    def __init__(self, timeout=HTTP_TIMEOUT, request_encoding=REQUEST_ENCODING):
+        super().__init__()
+        if request_encoding not in (None, "gzip", "zstd"):
+            raise ValueError(f"request_encoding must be None, 'gzip' or 'zstd', got {request_encoding!r}.")
+        if request_encoding == "zstd" and zstandard is None:
+            raise ValueError("zstd request encoding requires the zstandard package.")
+        self.timeout = timeout
+        self.request_encoding = request_encoding
+        # Hosts that answered a compressed request with 415, which are sent uncompressed bodies from then on
+        self.uncompressed_hosts = set()
+        # Only idempotent requests are retried on error responses, connection failures are retried for all requests
+        retry = Retry(
+            total=HTTP_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).netloc
+        if (
+            self.request_encoding is None
+            or request.method != "POST"
+            or not isinstance(request.body, (bytes, str))
+            or len(request.body) < COMPRESS_MIN_SIZE
+            or "Content-Encoding" in request.headers
+            or host in self.uncompressed_hosts
+        ):
+            return super().send(request, **kwargs)
+
+        body = request.body.encode() if isinstance(request.body, str) else request.body
+        compressed = request.copy()
+        compressed.body = compress(body, self.request_encoding)
+        compressed.headers["Content-Encoding"] = self.request_encoding
+        compressed.headers["Content-Length"] = str(len(compressed.body))
+        response = super().send(compressed, **kwargs)
+        if response.status_code == 415:
+            # A dispatcher that predates compressed requests, send this and later bodies as they are
+            print(f"{host} does not accept {self.request_encoding} request bodies, sending them uncompressed")
+            self.uncompressed_hosts.add(host)
+            return super().send(request, **kwargs)
+        return response
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
 
-session = requests.Session()
+def get_session():
+    """Returns this process's pooled HTTP session, creating a fresh one after a fork so no sockets are shared."""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = DispatcherSession()
+            _session_pid = os.getpid()
+        return _session
 
 FUNCTIONS: Dict[str, Tuple[Callable, Config]] = {}
 EXTENSION_NAME = ""
@@ -56,7 +150,7 @@ _RESERVED_BATCH_KEY = "RESERVED_OLOREN_KEYWORD_BATCH"
 
 
 def post_log_message(dispatcher_url, myUuid, progressId, level, message):
-    response = requests.post(
+    response = get_session().post(
         f"{dispatcher_url}/node_progress",
         headers={"Content-Type": "application/json"},
         json={
@@ -72,53 +166,208 @@ def log_message(dispatcher_url, myUuid, progressId, level, message):
     log_thread = threading.Thread(target=post_log_message, args=(dispatcher_url, myUuid, progressId, level, message))
     log_thread.start()
 
+_STOP_SHIPPING = object()
+
+
+class LogShipper:
+    """Ships one invocation's log messages to the dispatcher from a single background thread.
+
+    Messages are queued (blocking the caller once ``max_queued`` are waiting) and delivered in order. Messages logged
+    within ``flush_interval`` seconds of each other, up to ``max_batch`` of them, are sent as one progress message when
+    they share a level.
+    """
+
+    def __init__(self, dispatcher_url, myUuid, max_queued=10000, max_batch=100, flush_interval=0.1):
+        self.dispatcher_url = dispatcher_url
+        self.uuid = myUuid
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def log(self, level, message):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._ship, daemon=True)
+                self.thread.start()
+            self.queue.put((level, message))
+
+    def _post(self, batch):
+        for level, group in itertools.groupby(batch, key=lambda item: item[0]):
+            try:
+                get_session().post(
+                    f"{self.dispatcher_url}/node_progress",
+                    headers={"Content-Type": "application/json"},
+                    json={
+                        "progressId": str(uuid.uuid4()),
+                        "level": level,
+                        "type": "message",
+                        "data": {"message": "\n".join([message for _, message in group])},
+                        "uuid": self.uuid,
+                    },
+                )
+            except Exception as e:
+                print(f"Failed to post log message: {e}")
+
+    def _ship(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is _STOP_SHIPPING:
+                break
+            batch = [item]
+            deadline = time.time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get(timeout=max(0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if item is _STOP_SHIPPING:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._post(batch)
+
+    def flush(self, timeout=60):
+        """Delivers every queued message and stops the background thread. Later messages start a new one."""
+        with self.lock:
+            thread, self.thread = self.thread, None
+            if thread is None:
+                return
+            self.queue.put(_STOP_SHIPPING)
+        thread.join(timeout)
+
+
 def get_log_message_function(dispatcher_url, myUuid, token):
+    shipper = LogShipper(dispatcher_url, myUuid)
+
     def log(*messages, sep="", level=1):
-        log_message(dispatcher_url, myUuid, str(uuid.uuid4()), level, sep.join([str(x) for x in messages]))
-        
+        shipper.log(level, sep.join([str(x) for x in messages]))
+
+    def flush():
+        for bar in log.progress_bars:
+            bar.close()
+        shipper.flush()
+
     log.dispatcher_url = dispatcher_url
     log.uuid = myUuid
     log.token = token
+    log.progress_bars = []
+    log.flush = flush
 
     return log
 
 class ProgressBar:
-    def __init__(self, n, log_message):
+    """A progress bar shown on the node while the function runs.
+
+    Increments are counted locally and sent from a background thread at most once every ``min_interval`` seconds,
+    so incrementing in a tight loop never waits on the network. Pending increments are always sent before the node
+    finishes.
+
+    Args:
+        n (int): The total number of items.
+        log_message (Callable): The ``log_message`` function passed to your function.
+        iterable (Optional[Iterable]): If given, iterating over the progress bar yields its items and increments once
+            per item.
+        min_interval (float): The minimum number of seconds between updates. Defaults to 0.5.
+
+    Example::
+
+        @olo.register()
+        def count(n=olo.Num(), log_message=print):
+            for i in olo.ProgressBar(n, log_message, iterable=range(n)):
+                ...
+    """
+
+    def __init__(self, n, log_message, iterable=None, min_interval=0.5):
         self.n = n
         self.log_message = log_message
+        self.iterable = iterable
+        self.min_interval = min_interval
         self.progress_uuid = str(uuid.uuid4())
-        response = requests.post(
-            f"{log_message.dispatcher_url}/node_progress",
-            headers={"Content-Type": "application/json"},
-            json={
-                "progressId": self.progress_uuid,
-                "level": 1,
-                "type": "progressbar",
-                "data": {
-                            "numItems": n,
-                         },
-                "uuid": log_message.uuid,
-            },
-        )
-    
-    def increment(self):
-        response = requests.post(
-            f"{self.log_message.dispatcher_url}/node_progress",
-            headers={"Content-Type": "application/json"},
-            json={
-                "progressId": self.progress_uuid,
-                "level": 1,
-                "type": "progressbar",
-                "data": {
-                            str(uuid.uuid4()): 1
-                         },
-                "uuid": self.log_message.uuid,
-            },
-        )
-        
-        
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.thread = None
+        if hasattr(log_message, "progress_bars"):
+            log_message.progress_bars.append(self)
+        self._post({"numItems": n})
+
+    def _post(self, data):
+        try:
+            get_session().post(
+                f"{self.log_message.dispatcher_url}/node_progress",
+                headers={"Content-Type": "application/json"},
+                json={
+                    "progressId": self.progress_uuid,
+                    "level": 1,
+                    "type": "progressbar",
+                    "data": data,
+                    "uuid": self.log_message.uuid,
+                },
+            )
+        except Exception as e:
+            print(f"Failed to post progress: {e}")
+
+    def increment(self, k=1):
+        with self.lock:
+            self.pending += k
+            if self.thread is None and not self.closed.is_set():
+                self.thread = threading.Thread(target=self._send_updates, daemon=True)
+                self.thread.start()
+
+    def flush(self):
+        with self.lock:
+            k, self.pending = self.pending, 0
+        if k > 0:
+            self._post({str(uuid.uuid4()): k})
+
+    def _send_updates(self):
+        while not self.closed.wait(self.min_interval):
+            self.flush()
+            with self.lock:
+                if self.pending == 0:
+                    # Idle, the next increment starts a new thread
+                    self.thread = None
+                    return
+
+    def close(self):
+        """Sends any pending increments and stops sending updates."""
+        self.closed.set()
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
-def register(name="", description="", num_outputs=1):
+    def __iter__(self):
+        try:
+            for item in self.iterable:
+                yield item
+                self.increment()
+        finally:
+            self.close()
+
+
+def register(
+    name="",
+    description="",
+    num_outputs=1,
+    batch_parallelism=1,
+    batch_executor="thread",
+    cache=None,
+    graph_cache=None,
+    graph_cache_size=1024,
+    setup=None,
+    teardown=None,
+):
     """Register a function as an extension.
 
     The generated server satisfies the Oloren Orchestrator Extension API specification.
@@ -129,6 +378,25 @@ def register(name="", description="", num_outputs=1):
         name (str): Defaults to the name of the function.
         description (Optional[str]): A description of the function.
         num_outputs (int): The number of outputs the function returns. Defaults to 1.
+        batch_parallelism (int): The number of batch elements evaluated at the same time when the function is called
+            through olo.map. Defaults to 1.
+        batch_executor (str): Either "thread" or "process". Defaults to "thread". Use "process" for CPU bound
+            functions, in which case inputs and outputs must be picklable (so ``olo.Func`` inputs are not supported).
+        cache (Union[bool, ResultCache, None]): Memoize results by the function's source code and its inputs (File and
+            Dir inputs by their content). Pass True for an in-memory cache, or a ``olo.ResultCache`` to set its size,
+            TTL and on-disk store. Only JSON outputs are memoized, results containing output files are always
+            recomputed. The in-memory cache lives in the worker process, so it only hits across invocations when
+            ``olo.run`` is given ``workers``, without them give the ResultCache a ``directory``. Defaults to None.
+        graph_cache (Optional[str]): Memoize calls to ``olo.Func`` and ``olo.Funcs`` inputs by their graph and
+            arguments. "invocation" shares results within one invocation, "process" also across invocations handled
+            by the same worker process, which requires ``olo.run`` to be given ``workers``. Defaults to None.
+        graph_cache_size (int): The number of graph call results kept. Defaults to 1024.
+        setup (Optional[Callable[[], Any]]): Builds state that is expensive to create, like a loaded model. It is run
+            once per worker process, and its result is passed to the function as a ``state`` parameter if it has one.
+            ``olo.run`` runs it before serving, so with the default ``preload=True`` worker processes inherit the state
+            rather than loading it again. Defaults to None.
+        teardown (Optional[Callable[[Any], None]]): Called with the state when the process that ran ``setup`` exits.
+            Defaults to None.
 
     Example::
 
@@ -137,6 +405,15 @@ def register(name="", description="", num_outputs=1):
             return "foo", "bar"
     """
 
+    if graph_cache not in (None, "invocation", "process"):
+        raise ValueError(f"graph_cache must be None, 'invocation' or 'process', got {graph_cache!r}.")
+    if batch_executor not in ("thread", "process"):
+        raise ValueError(f"batch_executor must be 'thread' or 'process', got {batch_executor!r}.")
+    if setup is not None and not callable(setup):
+        raise TypeError("setup must be callable.")
+    if teardown is not None and setup is None:
+        raise ValueError("teardown requires setup.")
+
     def decorator(func):
         signature = inspect.signature(func)
 
@@ -149,10 +426,14 @@ def register(name="", description="", num_outputs=1):
         )
 
         log_message_on = False
+        state_on = False
         for param_key, param in zip(signature.parameters.keys(), signature.parameters.values()):
             if param_key == "log_message":
                 log_message_on = True
                 continue
+            if param_key == "state" and setup is not None:
+                state_on = True
+                continue
             if param_key == "map":
                 continue
             if isinstance(param.default, type):
@@ -171,6 +452,10 @@ def register(name="", description="", num_outputs=1):
         def wrappedFunc(*args, log_message=None, **kwargs):
             try:
                 print(f"Running function {func.__name__}", flush=True)
+                if setup is not None:
+                    state = get_warm_state(func.__name__)
+                    if state_on:
+                        kwargs["state"] = state
                 start_time = time.time()
                 if log_message_on:
                     y = func(*args, log_message=log_message, **kwargs)
@@ -184,6 +469,20 @@ def register(name="", description="", num_outputs=1):
                 traceback.print_exc()
                 raise e
 
+        wrappedFunc.decoders = [compile_decoder(arg) for arg in config.args]
+        wrappedFunc.batch_parallelism = batch_parallelism
+        wrappedFunc.batch_executor = batch_executor
+        wrappedFunc.result_cache = ResultCache() if cache is True else (cache or None)
+        wrappedFunc.graph_cache_scope = graph_cache
+        wrappedFunc.graph_cache_size = graph_cache_size
+        wrappedFunc.graph_cache = GraphCache(graph_cache_size) if graph_cache == "process" else None
+        wrappedFunc.setup = setup
+        wrappedFunc.teardown = teardown
+        try:
+            wrappedFunc.source = inspect.getsource(func)
+        except (OSError, TypeError):
+            wrappedFunc.source = func.__code__.co_code.hex()
+
         FUNCTIONS[func.__name__] = (wrappedFunc, config)
 
         return func
@@ -191,7 +490,38 @@ def register(name="", description="", num_outputs=1):
     return decorator
 
 
-import socketio
+_WARM_STATE = {}
+_WARM_STATE_LOCK = threading.Lock()
+
+
+def get_warm_state(FUNCTION_NAME):
+    """Returns the setup state of a registered function, running its setup hook if this process hasn't yet.
+
+    State created before a fork is inherited by the child. Teardown only runs in the process that ran setup.
+    """
+    with _WARM_STATE_LOCK:
+        if FUNCTION_NAME not in _WARM_STATE:
+            func = FUNCTIONS[FUNCTION_NAME][0]
+            print(f"Running setup for {FUNCTION_NAME}", flush=True)
+            start_time = time.time()
+            state = func.setup()
+            print(f"Finished setup for {FUNCTION_NAME} in {time.time() - start_time} seconds", flush=True)
+            if func.teardown is not None:
+                import multiprocessing.util
+
+                # Unlike atexit, these run when pool and forked workers exit, and are skipped in forked children
+                multiprocessing.util.Finalize(None, func.teardown, args=(state,), exitpriority=10)
+            _WARM_STATE[FUNCTION_NAME] = state
+        return _WARM_STATE[FUNCTION_NAME]
+
+
+def load_warm_states():
+    """Runs the setup hook of every registered function that has one."""
+    for FUNCTION_NAME, (func, _) in FUNCTIONS.items():
+        if func.setup is not None:
+            get_warm_state(FUNCTION_NAME)
+
+
 import requests
 import json
 from typing import List, Union
@@ -199,11 +529,6 @@ import uuid
 from threading import Timer
 
 
-@app.route("/")
-def health_check():
-    return "OK"
-
-
 def replace_last_instance(text, word_to_replace, replacement):
     index = text.rfind(word_to_replace)
     if index != -1:
@@ -212,22 +537,13 @@ def replace_last_instance(text, word_to_replace, replacement):
 
 
 def process_remoteentry(path):
-    with open(os.path.join(app.static_folder, path), "r") as file:
+    with open(os.path.join(STATIC_FOLDER, path), "r") as file:
         content = file.read()
         new_content = content.replace("var EXTENSIONNAME;", f"var {EXTENSION_NAME};")
         new_content = replace_last_instance(new_content, "EXTENSIONNAME", EXTENSION_NAME)
     return new_content
 
 
-@app.route("/ui/<path:path>")
-def serve_static_files(path):
-    if path.endswith("remoteEntry.js"):
-        new_content = process_remoteentry(path)
-        return Response(new_content, content_type="application/javascript")
-
-    return send_from_directory(app.static_folder, path)
-
-
 def get_directory_json():
     return {
         "nodes": [
@@ -242,11 +558,6 @@ def get_directory_json():
     }
 
 
-@app.route("/directory", methods=["GET"])
-def get_directory():
-    return jsonify(get_directory_json())
-
-
 from functools import wraps
 import errno
 import os
@@ -282,6 +593,9 @@ import uuid
 def connect_to_socket(dispatcher_url, max_retries=3, wait_timeout=10):
     socket_url = dispatcher_url.replace("http://", "ws://").replace("https://", "wss://")
 
+    # Only invocations that call olo.Func inputs need a socket, so the client isn't imported until then
+    import socketio
+
     socket = socketio.Client()
 
     retries = 0
@@ -304,130 +618,277 @@ def connect_to_socket(dispatcher_url, max_retries=3, wait_timeout=10):
 import random
 
 
+class GraphRouter:
+    """Routes ``node`` events on a shared connection to the graph call waiting on them.
+
+    Handlers are keyed by the graph element id (``{uid}-graph``), so any number of calls can be in flight on one
+    connection and each event costs a single dict lookup.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.lock = threading.Lock()
+
+    def register(self, graph_id, handler):
+        with self.lock:
+            self.handlers[graph_id] = handler
+
+    def unregister(self, graph_id):
+        with self.lock:
+            self.handlers.pop(graph_id, None)
+
+    def dispatch(self, node_data):
+        with self.lock:
+            handler = self.handlers.get(node_data["data"]["id"])
+        if handler is not None:
+            handler(node_data)
+
+
 class SocketManager:
     def __init__(self):
         self.connections = {}
-
-    def get_connection(self, client_uuid, dispatcher_url, node_id, after_connect_callback=None):
+        self.routers = {}
+        self.client_locks = {}
+        self.holders = {}
+        # Guards the dicts only, connecting happens under the client's own lock so other clients never wait on it
+        self.lock = threading.Lock()
+
+    def get_router(self, client_uuid):
+        """Returns the GraphRouter for ``client_uuid``'s connection, creating it if needed."""
+        with self.lock:
+            if client_uuid not in self.routers:
+                self.routers[client_uuid] = GraphRouter()
+            return self.routers[client_uuid]
+
+    def get_connection(self, client_uuid, dispatcher_url, node_id, after_connect_callback=None, timeout=None):
         """Creates connection if it doesn't exist, otherwise returns existing connection
 
+        ``after_connect_callback`` is called with the connection's uuid once the dispatcher has acknowledged it, callers
+        that find the connection still registering wait up to ``timeout`` seconds for that.
+
         Returns:
         (socketio.Client, uuid)
         """
 
-        if client_uuid not in self.connections:
-            blue_node_uuid = str(uuid.uuid4())
-            socket = connect_to_socket(dispatcher_url)
-            socket.emit(
-                "extensionregister",
-                data={"uuid": blue_node_uuid, "node_id": node_id},
-                callback=lambda *args: after_connect_callback(blue_node_uuid),
-            )
-
-            self.connections[client_uuid] = (socket, blue_node_uuid)
-
-            return socket
+        router = self.get_router(client_uuid)
+        with self.lock:
+            client_lock = self.client_locks.setdefault(client_uuid, threading.Lock())
+
+        with client_lock:
+            with self.lock:
+                connection = self.connections.get(client_uuid)
+            if connection is None:
+                blue_node_uuid = str(uuid.uuid4())
+                registered = threading.Event()
+                socket = connect_to_socket(dispatcher_url)
+                socket.on("node", router.dispatch)
+
+                def on_registered(*args):
+                    registered.set()
+                    if after_connect_callback is not None:
+                        after_connect_callback(blue_node_uuid)
+
+                # Stored before the acknowledgement, so other callers wait on its event rather than connecting again
+                with self.lock:
+                    self.connections[client_uuid] = (socket, blue_node_uuid, registered)
+
+                socket.emit(
+                    "extensionregister", data={"uuid": blue_node_uuid, "node_id": node_id}, callback=on_registered
+                )
+                return socket
 
-        socket, blue_node_uuid = self.connections[client_uuid]
+        socket, blue_node_uuid, registered = connection
         if after_connect_callback is not None:
+            # Graphs started under a uuid the dispatcher hasn't registered yet would never report back
+            if not registered.wait(timeout):
+                raise TimeoutError(f"The dispatcher did not acknowledge connection {blue_node_uuid} in time")
             after_connect_callback(blue_node_uuid)
         return socket
 
+    @contextmanager
+    def holding(self, client_uuid):
+        """Keeps ``client_uuid``'s connection open while the block runs, closing it after the last holder leaves.
+
+        Long-lived pool workers would otherwise keep a socket open for every invocation they have run.
+        """
+        with self.lock:
+            self.holders[client_uuid] = self.holders.get(client_uuid, 0) + 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.holders[client_uuid] -= 1
+                connection = None
+                if self.holders[client_uuid] == 0:
+                    del self.holders[client_uuid]
+                    connection = self.connections.pop(client_uuid, None)
+                    self.routers.pop(client_uuid, None)
+                    self.client_locks.pop(client_uuid, None)
+            if connection is not None:
+                try:
+                    connection[0].disconnect()
+                except Exception as e:
+                    print(f"Failed to close socket connection: {e}")
+
 
 _RESERVED_INPUT_KEY = "INITIALIZE_SOCKET_RESERVED_ORCHESTRATOR_INPUT"
 
 manager = SocketManager()
 
 
+class GraphTemplate:
+    """An ``olo.Func`` graph preprocessed once, so that each call only has to serialize its own inputs.
+
+    The graph is serialized on first use without its ``id`` and ``input_ids``, which are the only parts of it that
+    change between calls, and the ids for the input elements are precomputed. Nothing is computed until then, so a
+    graph the function never calls can't fail the invocation.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.prepared = False
+        self._json = None
+
+    def prepare(self):
+        if self.prepared:
+            return
+        graph = self.graph
+        self.max_id = max([outputId["id"] for outputId in graph["output_ids"]]) + 1
+
+        body = json.dumps({key: value for key, value in graph.items() if key not in ("id", "input_ids")})
+        self.prefix = body[:-1] + (", " if body != "{}" else "")
+        self.prepared = True
+
+    @property
+    def json(self):
+        """The whole graph serialized with sorted keys, for cache keys. Only built when a graph cache asks for it."""
+        if self._json is None:
+            self._json = json.dumps(self.graph, sort_keys=True)
+        return self._json
+
+    def render(self, uid, inputs):
+        """Returns the JSON bytes for the graph followed by one extractdata element per input."""
+        self.prepare()
+        input_ids = [{"id": self.max_id + idx} for idx in range(len(inputs))]
+        elements = [
+            {
+                "id": f"{uid}-input-{idx}",
+                "data": inp,
+                "operator": "extractdata",
+                "input_ids": [],
+                "output_ids": [input_ids[idx]],
+            }
+            for idx, inp in enumerate(inputs)
+        ]
+        graph = f'{self.prefix}"id": {json.dumps(f"{uid}-graph")}, "input_ids": {json.dumps(input_ids)}}}'.encode()
+        if len(elements) == 0:
+            return b"[" + graph + b"]"
+        return b"[" + graph + b", " + serialize.dumps(elements)[1:]
+
+
 def run_blue_node(
-    graph, node_id, dispatcher_url, inputs, client_uuid, uid=None, token=None, timeout=15 * 60 * 200, retries=3
+    graph, node_id, dispatcher_url, inputs, client_uuid, uid=None, token=None, timeout=15 * 60, retries=3
 ):
+    """Runs ``graph`` on the dispatcher with ``inputs`` and blocks until its output arrives.
+
+    The calling thread sleeps on an event rather than polling. ``timeout`` is the wall-clock limit in seconds for the
+    whole call, including retries after errors. A call that times out is not retried, as the graph may still be running.
+    """
     if retries == 0:
         raise Exception("Failed to run blue node")
+    started = time.time()
     try:
         if len(inputs) == 1 and inputs[0] == _RESERVED_INPUT_KEY:
-            finished = False
-
-            def wait_finished(*args):
-                nonlocal finished
-                finished = True
-
-            socket = manager.get_connection(client_uuid, dispatcher_url, node_id, after_connect_callback=wait_finished)
+            registered = threading.Event()
+
+            socket = manager.get_connection(
+                client_uuid,
+                dispatcher_url,
+                node_id,
+                after_connect_callback=lambda *args: registered.set(),
+                timeout=timeout,
+            )
 
-            while True:
-                if finished:
-                    return
-                time.sleep(0.005)
+            if not registered.wait(timeout):
+                raise TimeoutError(f"The dispatcher did not acknowledge the connection within {timeout} seconds")
+            return
 
         assert (
             token is not None
         ), "Token must be provided, you likely need to assign the permission 'Run Graph Access` via the Extensions window"
 
-        maxId = max([outputId["id"] for outputId in graph["output_ids"]]) + 1
+        if not isinstance(graph, GraphTemplate):
+            graph = GraphTemplate(graph)
         if not uid:
             uid = str(uuid.uuid4())
 
-        newElements = [
-            {
-                "id": f"{uid}-input-{idx}",
-                "data": inp,
-                "operator": "extractdata",
-                "input_ids": [],
-                "output_ids": [{"id": maxId + idx}],
-            }
-            for idx, inp in enumerate(inputs)
-        ]
-
-        newGraph = [graph] + newElements
-        newGraph = json.loads(json.dumps(newGraph))
-        newGraph[0]["id"] = f"{uid}-graph"
-        newGraph[0]["input_ids"] = [el["output_ids"][0] for el in newElements]
+        graph_json = graph.render(uid, inputs)
 
         output = None
         error = None
+        done = threading.Event()
 
         start_time = time.time()
 
         def on_extensionregister_response(blue_node_uuid):
-            response = requests.post(
-                f"{dispatcher_url}/run_graph",
-                data=json.dumps({"graph": newGraph, "uuid": blue_node_uuid}),
-                headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"},
-            )
+            nonlocal error
+            try:
+                response = get_session().post(
+                    f"{dispatcher_url}/run_graph",
+                    data=b'{"graph": ' + graph_json + b', "uuid": ' + json.dumps(blue_node_uuid).encode() + b"}",
+                    headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"},
+                )
+            except Exception as e:
+                error = str(e)
+                done.set()
+                return
 
             if response.status_code != 200:
-                raise Exception(response.text)
+                # This may run on the socket's thread, so hand the error to the waiting caller
+                error = response.text
+                done.set()
             else:
                 print(f"Successfully started graph {uid} in {time.time() - start_time} seconds")
 
-        socket = manager.get_connection(
-            client_uuid, dispatcher_url, node_id, after_connect_callback=on_extensionregister_response
-        )
-
-        @socket.on("node")
         def node(node_data):
             nonlocal output, error
-            if f"{uid}-graph" == node_data["data"]["id"]:
-                if node_data["status"] == "finished":
-                    if len(node_data["data"]["output_ids"]) > 0:
-                        output = node_data["output"]
-                elif node_data["status"] != "running":
-                    print("Received error on ", node_data["data"]["id"])
-                    error = json.dumps(node_data)
-
-        timeout_counter = timeout
-        while True:
-            if timeout_counter <= 0:
-                raise Exception("Timeout")
-            if output is not None:
-                return output
-            if error is not None:
-                raise Exception(error)
-            time.sleep(0.005)
-            timeout_counter -= 1
+            if node_data["status"] == "finished":
+                if len(node_data["data"]["output_ids"]) > 0:
+                    output = node_data["output"]
+                done.set()
+            elif node_data["status"] != "running":
+                print("Received error on ", node_data["data"]["id"])
+                error = json.dumps(node_data)
+                done.set()
+
+        # Register before starting the graph so no event can arrive ahead of its handler
+        router = manager.get_router(client_uuid)
+        router.register(f"{uid}-graph", node)
+        try:
+            manager.get_connection(
+                client_uuid,
+                dispatcher_url,
+                node_id,
+                after_connect_callback=on_extensionregister_response,
+                timeout=timeout,
+            )
+
+            if not done.wait(timeout):
+                raise TimeoutError(f"Graph {uid} did not finish within {timeout} seconds")
+        finally:
+            router.unregister(f"{uid}-graph")
 
+        if error is not None:
+            raise Exception(error)
+        return decode_spilled_outputs(output)
+
+    except TimeoutError:
+        raise
     except Exception as e:
         print(f"Exception occurred: {e}")
+        remaining = timeout - (time.time() - started)
+        if remaining <= 0:
+            raise TimeoutError(f"Graph call did not finish within the timeout, last error: {e}")
         return run_blue_node(
             graph,
             node_id,
@@ -436,69 +897,493 @@ def run_blue_node(
             client_uuid,
             uid=uid,
             token=token,
-            timeout=timeout,
+            timeout=remaining,
             retries=retries - 1,
         )
 
 
-from multiprocessing import Process, Manager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED
+from concurrent.futures import wait as futures_wait
+from collections import deque
+import math
 
 
-@app.route("/operator/<FUNCTION_NAME>", methods=["POST"])
-def operator(FUNCTION_NAME):
-    start_dir = os.getcwd()
-    print("Starting in directory: ", start_dir)
-    try:
-        body = request.json
-        body["node"]
-        body["inputs"]
-        body["id"]
+class WorkerPoolFull(Exception):
+    pass
 
-        DISPATCHER_URL_ = body.get("dispatcherurl") or f"http://{os.environ['DISPATCHER_URL']}"
 
-        p = Process(target=execute_function, args=(DISPATCHER_URL_, body, FUNCTION_NAME))
-        p.start()
+def _run_pooled(fn, submitted_at, *args):
+    started_at = time.time()
+    fn(*args)
+    return started_at - submitted_at, time.time() - started_at
 
-        response = jsonify("Ok")
-        response.status_code = 200
-        print("Returning response")
-        return response
-    except Exception:
-        error_msg = traceback.format_exc()
-        requests.post(
-            f"{DISPATCHER_URL_}/node_error",
-            headers={"Content-Type": "application/json"},
-            json={
-                "node": body["id"],
-                "error": error_msg,
-            },
-        )
-        print("Returning error")
-        return error_msg, 500
+
+def _worker_pid():
+    # Long enough that the other idle workers pick up the rest of the batch
+    time.sleep(0.01)
+    return os.getpid()
+
+
+class WorkerPool:
+    """Runs execute_function off the request thread.
+
+    With ``workers`` set, invocations are queued onto that many long-lived processes, so heavy imports are paid once per
+    worker rather than once per call. The workers are forked and run their initializer when the pool is configured, so
+    before the server accepts requests. Without it, every invocation gets its own process as before, which a watcher
+    thread reaps as soon as it exits.
+
+    Submissions beyond the configured limits raise WorkerPoolFull instead of being accepted, so callers can shed load.
+    """
+
+    def __init__(self, workers=None, max_in_flight=None, max_queued=None):
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.initializer = None
+        self.executor = None
+        self.lock = threading.Lock()
+        self.processes = []
+        self.outstanding = 0
+        self.rejected = 0
+        self.completed = 0
+        self.waits = deque(maxlen=100)
+        self.runs = deque(maxlen=100)
+
+    def configure(self, workers=None, max_in_flight=None, max_queued=None, initializer=None):
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be a positive integer or None.")
+        if workers is not None and max_in_flight is not None:
+            raise ValueError("max_in_flight only applies when workers is None, a pool runs at most `workers` at once.")
+        if workers is None and max_queued is not None:
+            raise ValueError("max_queued requires workers, without a pool invocations are never queued.")
+        self.shutdown()
+        with self.lock:
+            self.workers = workers
+            self.max_in_flight = max_in_flight
+            self.max_queued = max_queued
+            self.initializer = initializer
+            self.rejected = 0
+            self.completed = 0
+            self.waits.clear()
+            self.runs.clear()
+        if workers is not None:
+            self._start_workers()
+
+    def _start_workers(self):
+        """Forks every worker and waits until each has run its initializer and taken a task."""
+        executor = self._get_executor()
+        started = set()
+        while len(started) < self.workers:
+            started.update(future.result() for future in [executor.submit(_worker_pid) for _ in range(self.workers)])
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer)
+            return self.executor
+
+    def _reset_executor(self, executor):
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False)
+
+    def _in_flight_and_queued(self):
+        if self.workers is None:
+            # Exited processes stay listed until their watcher has recorded them
+            return sum(1 for p in self.processes if p.is_alive()), 0
+        in_flight = min(self.outstanding, self.workers)
+        return in_flight, self.outstanding - in_flight
+
+    def _has_capacity(self):
+        in_flight, queued = self._in_flight_and_queued()
+        if self.workers is None:
+            return self.max_in_flight is None or in_flight < self.max_in_flight
+        return self.max_queued is None or in_flight + queued < self.workers + self.max_queued
+
+    def _on_done(self, future):
+        with self.lock:
+            self.outstanding -= 1
+            self.completed += 1
+            if not future.cancelled() and future.exception() is None:
+                wait, run = future.result()
+                self.waits.append(wait)
+                self.runs.append(run)
+
+    def _reap(self, process, started_at):
+        process.join()
+        with self.lock:
+            # Processes dropped by shutdown belong to a previous configuration
+            if process in self.processes:
+                self.processes.remove(process)
+                self.completed += 1
+                self.runs.append(time.time() - started_at)
+
+    def submit(self, fn, *args):
+        with self.lock:
+            if not self._has_capacity():
+                self.rejected += 1
+                raise WorkerPoolFull("Too many invocations in progress, try again later.")
+
+            if self.workers is None:
+                from multiprocessing import Process
+
+                p = Process(target=fn, args=args)
+                p.start()
+                self.processes.append(p)
+                threading.Thread(target=self._reap, args=(p, time.time()), daemon=True).start()
+                return p
+
+            self.outstanding += 1
+
+        from concurrent.futures.process import BrokenProcessPool
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run_pooled, fn, time.time(), *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM killed), start over with a fresh pool
+            self._reset_executor(executor)
+            try:
+                future = self._get_executor().submit(_run_pooled, fn, time.time(), *args)
+            except Exception:
+                with self.lock:
+                    self.outstanding -= 1
+                raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def retry_after(self):
+        """Seconds a rejected caller should wait before retrying, estimated from recent run times."""
+        with self.lock:
+            if len(self.runs) == 0:
+                return 1
+            return max(1, math.ceil(sum(self.runs) / len(self.runs)))
+
+    def stats(self):
+        with self.lock:
+            in_flight, queued = self._in_flight_and_queued()
+            return {
+                "workers": self.workers,
+                "in_flight": in_flight,
+                "queued": queued,
+                "max_in_flight": self.workers if self.workers is not None else self.max_in_flight,
+                "max_queued": self.max_queued if self.workers is not None else 0,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_seconds": sum(self.waits) / len(self.waits) if len(self.waits) > 0 else 0,
+                "max_wait_seconds": max(self.waits) if len(self.waits) > 0 else 0,
+                "avg_run_seconds": sum(self.runs) / len(self.runs) if len(self.runs) > 0 else 0,
+            }
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            executor, self.executor = self.executor, None
+            processes, self.processes = self.processes, []
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        if wait:
+            for p in processes:
+                p.join()
+
+
+worker_pool = WorkerPool()
+
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_PART_SIZE = 16 * 1024 * 1024
+DOWNLOAD_PARALLELISM = 8
+
+
+def _download_range(signed_url, path, start, end):
+    response = get_session().get(signed_url, stream=True, headers={"Range": f"bytes={start}-{end}"})
+    response.raise_for_status()
+    if response.status_code != 206:
+        raise Exception(f"Expected a partial response for bytes {start}-{end}, got {response.status_code}")
+    with open(path, "r+b") as file:
+        file.seek(start)
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            file.write(chunk)
+        if file.tell() != end + 1:
+            raise Exception(f"Incomplete download of bytes {start}-{end}")
+
+
+def _download_to(signed_url, path):
+    """Downloads ``signed_url`` to ``path``.
+
+    The first request asks for only the first part of the object. If the server honours it and the object is larger,
+    the remaining parts are fetched with parallel range requests, otherwise the full response is streamed as is.
+    """
+    response = get_session().get(signed_url, stream=True, headers={"Range": f"bytes=0-{DOWNLOAD_PART_SIZE - 1}"})
+    if response.status_code == 416:
+        # S3 refuses any range of an empty object, a plain GET returns it
+        response.close()
+        response = get_session().get(signed_url, stream=True)
+    response.raise_for_status()
+
+    total = None
+    if response.status_code == 206 and "/" in response.headers.get("Content-Range", ""):
+        size = response.headers["Content-Range"].rsplit("/", 1)[1]
+        total = int(size) if size.isdigit() else None
+
+    with open(path, "wb") as file:
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            file.write(chunk)
+        if total is not None and file.tell() != min(total, DOWNLOAD_PART_SIZE):
+            raise Exception(f"Incomplete download of bytes 0-{min(total, DOWNLOAD_PART_SIZE) - 1}")
+        if total is None or total <= DOWNLOAD_PART_SIZE:
+            return
+        file.truncate(total)
+
+    parts = [
+        (start, min(start + DOWNLOAD_PART_SIZE, total) - 1) for start in range(DOWNLOAD_PART_SIZE, total, DOWNLOAD_PART_SIZE)
+    ]
+    with ThreadPoolExecutor(max_workers=min(DOWNLOAD_PARALLELISM, len(parts))) as executor:
+        for future in [executor.submit(_download_range, signed_url, path, start, end) for start, end in parts]:
+            future.result()
+
+
+class MultipartStream:
+    """A multipart/form-data request body that reads its files as it is sent.
+
+    requests builds ``files=`` uploads in memory, so this is passed as ``data=`` instead, with the Content-Type from
+    ``content_type``. Its length is known upfront so the upload is not chunked.
+
+    Args:
+        fields (Dict[str, str]): Plain form fields.
+        files (Dict[str, Any]): Form file fields, each a path or a seekable binary file object, or a
+            ``(filename, file)`` tuple. The filename sent defaults to the field name.
+    """
+
+    def __init__(self, fields, files):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.parts = []
+        for name, value in fields.items():
+            self.parts.append(
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode()
+                + str(value).encode()
+                + b"\r\n"
+            )
+        try:
+            for name, file in files.items():
+                filename, file = file if isinstance(file, tuple) else (name, file)
+                self.parts.append(
+                    f"--{self.boundary}\r\n"
+                    f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n\r\n'.encode()
+                )
+                self.parts.append(open(file, "rb") if isinstance(file, str) else file)
+                self.parts.append(b"\r\n")
+            self.parts.append(f"--{self.boundary}--\r\n".encode())
+
+            self.length = 0
+            for part in self.parts:
+                if isinstance(part, bytes):
+                    self.length += len(part)
+                else:
+                    start = part.tell()
+                    self.length += part.seek(0, io.SEEK_END) - start
+                    part.seek(start)
+        except BaseException:
+            # __exit__ never runs when the constructor fails, e.g. on a missing OutputFile path
+            self.close()
+            raise
+
+        self.index = 0
+        self.offset = 0
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        chunks = []
+        while self.index < len(self.parts) and (size < 0 or size > 0):
+            part = self.parts[self.index]
+            if isinstance(part, bytes):
+                chunk = part[self.offset :] if size < 0 else part[self.offset : self.offset + size]
+                self.offset += len(chunk)
+                if self.offset >= len(part):
+                    self.index += 1
+                    self.offset = 0
+            else:
+                chunk = part.read(size)
+                if size < 0 or len(chunk) < size:
+                    self.index += 1
+            if size > 0:
+                size -= len(chunk)
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        for part in self.parts:
+            if not isinstance(part, bytes):
+                part.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
 
 def download_from_signed_url(signed_url):
     with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-        response = requests.get(signed_url, stream=True)
-        for chunk in response.iter_content(chunk_size=8192):
-            tmp_file.write(chunk)
+        pass
+    _download_to(signed_url, tmp_file.name)
     return tmp_file.name
 
+
+file_cache = FileCache.from_env()
+
+
+def download_input(record):
+    """Downloads a file record to a temporary path, serving it from the local file cache when enabled.
+
+    The cache is enabled by setting ``OLOREN_FILE_CACHE_DIR``. Cached files are hardlinked to the returned path where
+    possible, so functions should not modify their input files in place.
+    """
+    if file_cache is None:
+        return download_from_signed_url(record["url"])
+
+    path = _link_from_cache(file_record_key(record), partial(_download_to, record["url"]), link_or_copy)
+    return path if path is not None else download_from_signed_url(record["url"])
+
+
+def _link_from_cache(key, fill, link, directory=False):
+    """Links a cached entry into place, filling the cache first on a miss. Returns None if another worker keeps
+    evicting the entry before it can be linked."""
+    for _ in range(2):
+        cached = file_cache.get_or_put(key, fill, directory=directory)
+        try:
+            return link(cached)
+        except (FileNotFoundError, shutil.Error):
+            # Evicted by another worker between the lookup and the link
+            pass
+    return None
+
+
+# Outputs whose JSON is larger than this many bytes are sent as compressed files. Off (0) by default, as consumers
+# only recognize them if the dispatcher keeps the file name in the record or its URL
+SPILL_THRESHOLD = int(os.getenv("OLOREN_SPILL_THRESHOLD", "0"))
+SPILL_SUFFIX = ".olo.json.gz"
+_SPILL_NAME_FIELDS = ("name", "filename", "path", "key", "Key")
+
+
+def is_spilled_output(value):
+    """Whether an input is the file record of an output that the upstream node spilled to a compressed file."""
+    if not isinstance(value, dict) or not isinstance(value.get("url"), str):
+        return False
+    names = [value.get(field) for field in _SPILL_NAME_FIELDS] + [urlsplit(value["url"]).path]
+    return any(isinstance(name, str) and name.endswith(SPILL_SUFFIX) for name in names)
+
+
+def spill_output(encoded, path):
+    """Writes an encoded output to ``path`` as gzipped JSON."""
+    with gzip.open(path, "wb", compresslevel=6) as file:
+        file.write(encoded)
+
+
+def download_spilled_output(record):
+    """Downloads a spilled output and decodes it back to the value the upstream function returned."""
+    path = download_input(record)
+    try:
+        with gzip.open(path, "rb") as file:
+            return serialize.loads(file.read())
+    finally:
+        os.remove(path)
+
+
+def decode_spilled_outputs(outputs):
+    """Replaces any spilled outputs in a graph's outputs with their values."""
+    if is_spilled_output(outputs):
+        return download_spilled_output(outputs)
+    if not isinstance(outputs, list) or not any(is_spilled_output(output) for output in outputs):
+        return outputs
+    return [download_spilled_output(output) if is_spilled_output(output) else output for output in outputs]
+
+
+def _extract_to(signed_url, path):
+    """Extracts the zip archive at ``signed_url`` into the directory ``path``.
+
+    With the optional ``stream-unzip`` package installed, members are extracted as the archive downloads and it never
+    touches disk. Otherwise, or if the archive can't be read as a stream, it is downloaded to a temporary file which is
+    removed once extracted.
+    """
+    # Imported on first use as it pulls in asyncio, which nothing else needs
+    try:
+        from stream_unzip import stream_unzip
+
+    except ImportError:
+        stream_unzip = None
+
+    os.makedirs(path, exist_ok=True)
+    if stream_unzip is not None:
+        try:
+            response = get_session().get(signed_url, stream=True)
+            response.raise_for_status()
+            for name, _, chunks in stream_unzip(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)):
+                name = name.decode("utf-8", errors="replace")
+                parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+                member = os.path.join(path, *parts) if len(parts) > 0 else path
+                if name.endswith("/"):
+                    os.makedirs(member, exist_ok=True)
+                    for _ in chunks:
+                        pass
+                    continue
+                os.makedirs(os.path.dirname(member), exist_ok=True)
+                with open(member, "wb") as file:
+                    for chunk in chunks:
+                        file.write(chunk)
+            return
+        except Exception as e:
+            print(f"Could not stream extract directory input, falling back to a full download: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+
+    fd, archive = tempfile.mkstemp(suffix=".zip")
+    os.close(fd)
+    try:
+        _download_to(signed_url, archive)
+        with zipfile.ZipFile(archive, "r") as zip_ref:
+            zip_ref.extractall(path)
+    finally:
+        os.remove(archive)
+
+
+def download_dir_input(record):
+    """Downloads and extracts a directory record to a temporary directory.
+
+    With the local file cache enabled, the extracted tree is cached and hardlinked into place on later invocations.
+    """
+    if file_cache is None:
+        path = tempfile.mkdtemp()
+        _extract_to(record["url"], path)
+        return path
+
+    path = _link_from_cache(file_record_key(record) + "-dir", partial(_extract_to, record["url"]), link_tree, True)
+    if path is None:
+        path = tempfile.mkdtemp()
+        _extract_to(record["url"], path)
+    return path
+
+
 def download_from_file_record(record, 
                               dispatcher_url=config["DISPATCHER_URL"], 
                               token=config["TOKEN"]):
-    purl = requests.post(
+    purl = get_session().post(
             f"{dispatcher_url}/get_purl",
             data=json.dumps({"files": [record]}),
             headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"},
         )
 
-    return download_from_signed_url(purl.json()[0]["url"])
+    return download_input({**record, "url": purl.json()[0]["url"]})
 
 def download_from_registered_file(path, 
                                   dispatcher_url=config["DISPATCHER_URL"], 
                                   token=config["TOKEN"]):
-    purl = requests.post(
+    purl = get_session().post(
         f"{dispatcher_url}/get_registered_purl",
             data=json.dumps({"path": path}),
             headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"},
@@ -510,159 +1395,404 @@ def download_from_registered_file(path,
 
     return download_from_signed_url(purl.json()[0]['url'])
 
+def _call_registered(FUNCTION_NAME, args, log_args):
+    dispatcher_url, myUuid, token = log_args
+    log_message = get_log_message_function(dispatcher_url, myUuid, token=token)
+    try:
+        return FUNCTIONS[FUNCTION_NAME][0](*args, log_message=log_message)
+    finally:
+        log_message.flush()
+
+
+def run_batch(FUNCTION_NAME, arg_lists, log_message):
+    """Evaluates a registered function over a batch of argument lists, returning the outputs in order."""
+    func = FUNCTIONS[FUNCTION_NAME][0]
+    arg_lists = [list(args) for args in arg_lists]
+
+    if func.batch_parallelism <= 1 or len(arg_lists) <= 1:
+        return [func(*args, log_message=log_message) for args in arg_lists]
+
+    workers = min(func.batch_parallelism, len(arg_lists))
+    if func.batch_executor == "thread":
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda args: func(*args, log_message=log_message), arg_lists))
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    log_args = (log_message.dispatcher_url, log_message.uuid, log_message.token)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(_call_registered, itertools.repeat(FUNCTION_NAME), arg_lists, itertools.repeat(log_args))
+        )
+
+
+DecodeContext = namedtuple("DecodeContext", ["downloads", "run_graph"])
+
+_PATH_INPUT_ERRORS = {
+    "File": "File inputs must be signed URLs. The error is most likely caused by mapping a non-file input to a file input.",
+    "Dir": "Directory inputs must be signed URLs. The error is most likely caused by mapping a non-directory input to a directory input.",
+}
+
+
+def compile_decoder(arg):
+    """Builds the converter that turns an argument's raw input value into what the function receives.
+
+    Decoders are built once by register and called as ``decoder(i, value, context)`` for every invocation. When a
+    decoder's ``prefetch(value)`` is true, execute_function fetches the input up front with its ``downloader``.
+    """
+    if arg.type in _PATH_INPUT_ERRORS:
+        message = _PATH_INPUT_ERRORS[arg.type]
+
+        def decode(i, value, context):
+            assert isinstance(value, dict) and "url" in value, message
+            return context.downloads[i].result()
+
+        decode.prefetch = lambda value: isinstance(value, dict) and "url" in value
+        decode.downloader = download_dir_input if arg.type == "Dir" else download_input
+        return decode
+
+    null_value = arg.default
+    if arg.type == "Option" and arg.ty._type == "Bool" and arg.default is None:
+        null_value = False
+
+    if arg.type == "Func":
+        convert = lambda value, context: partial(context.run_graph, graph=GraphTemplate(value))
+    elif arg.type == "Funcs":
+        convert = lambda value, context: {
+            j: partial(context.run_graph, graph=GraphTemplate(graph)) for j, graph in enumerate(value)
+        }
+    else:
+        convert = None
+
+    def decode(i, value, context):
+        if value == NULL_VALUE:
+            return null_value
+        if i in context.downloads:
+            value = context.downloads[i].result()
+        return value if convert is None else convert(value, context)
+
+    decode.prefetch = is_spilled_output
+    decode.downloader = download_spilled_output
+    return decode
+
+
+def result_cache_key(FUNCTION_NAME, raw_inputs, inputs):
+    """Hashes a function's identity and inputs, using the downloaded contents for File and Dir inputs and the file
+    identity for spilled outputs."""
+    func, config = FUNCTIONS[FUNCTION_NAME]
+    parts = [
+        hash_path(inputs[i])
+        if config.args[i].type in ("File", "Dir")
+        else file_record_key(raw_inputs[i])
+        if is_spilled_output(raw_inputs[i])
+        else raw_inputs[i]
+        for i in range(len(inputs))
+    ]
+    key = json.dumps([FUNCTION_NAME, func.source, parts], sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def post_outputs(dispatcher_url, body, outputs):
+    # Outputs are encoded one by one, so that any over SPILL_THRESHOLD can be sent as files instead
+    encoded = [None if isinstance(output, (OutputFile, io.BytesIO)) else serialize.dumps(output) for output in outputs]
+
+    # Output files are streamed from disk rather than read into memory
+    files = {
+        str(i): output.path if isinstance(output, OutputFile) else output
+        for i, output in enumerate(outputs)
+        if isinstance(output, (OutputFile, io.BytesIO))
+    }
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        for i, part in enumerate(encoded):
+            if part is not None and SPILL_THRESHOLD > 0 and len(part) > SPILL_THRESHOLD:
+                filename = f"output{i}{SPILL_SUFFIX}"
+                spill_output(part, os.path.join(spill_dir, filename))
+                print(f"Sending output {i} ({len(part)} bytes of JSON) as {filename}")
+                files[str(i)] = (filename, os.path.join(spill_dir, filename))
+                encoded[i] = None
+
+        output_json = b"[" + b", ".join(b'""' if part is None else part for part in encoded) + b"]"
+
+        if len(files) > 0:
+            form_data = {"node": body["id"], "output": output_json.decode()}
+
+            with MultipartStream(form_data, files) as stream:
+                response = get_session().post(
+                    f"{dispatcher_url}/node_finished_file",
+                    data=stream,
+                    headers={"Content-Type": stream.content_type},
+                )
+
+            if response.status_code != 200:
+                print(f"Failed to call node_finished_file on finish: {response.text}")
+                raise Exception(f"Failed to call node_finished_file on finish: {response.text}")
+            return
+
+    response = get_session().post(
+        f"{dispatcher_url}/node_finished",
+        headers={"Content-Type": "application/json"},
+        data=b'{"node": ' + serialize.dumps(body["id"]) + b', "output": ' + output_json + b"}",
+    )
+
+    if response.status_code != 200:
+        print(f"Failed to call node_finished on finish: {response.text}")
+        raise Exception(f"Failed to call node_finished on finish: {response.text}")
+
+
 def execute_function(dispatcher_url, body, FUNCTION_NAME):
     token = body["node"]["token"]
 
     all_func = {}
 
-    def my_run_graph(*args, graph=None, timeout=15*60*200):
-        return run_blue_node(graph, body["id"], dispatcher_url, args, body["uuid"], token=token, timeout = timeout)
+    graph_cache = None
 
-    try:
-        inputs = [inp["value"] for inp in body["node"]["data"]]
-
-        if "input_handles" in body["node"]:
-            for input_idx, i in enumerate(sorted(body["node"]["input_handles"].keys())):
-                inputs[int(i)] = body["inputs"][input_idx]
-
-        for i, input in enumerate(inputs):  # convert file inputs into file paths
-            if FUNCTIONS[FUNCTION_NAME][1].args[i].type == "File":
-                assert (
-                    isinstance(input, dict) and "url" in input
-                ), "File inputs must be signed URLs. The error is most likely caused by mapping a non-file input to a file input."
-                inputs[i] = download_from_signed_url(inputs[i]["url"])
-            elif FUNCTIONS[FUNCTION_NAME][1].args[i].type == "Dir":
-                assert (
-                    isinstance(input, dict) and "url" in input
-                ), "Directory inputs must be signed URLs. The error is most likely caused by mapping a non-directory input to a directory input."
-                inputs[i] = download_from_signed_url(inputs[i]["url"])
-                os.rename(inputs[i], inputs[i] + ".zip")
-                with zipfile.ZipFile(inputs[i] + ".zip", "r") as zip_ref:
-                    zip_ref.extractall(inputs[i])
-            elif FUNCTIONS[FUNCTION_NAME][1].args[i].type == "Func":
-                input_graph = copy.deepcopy(inputs[i])
-
-                # all_func[i] = partial(my_run_graph, graph=input_graph)
-                # inputs[i] = all_func[i]
-                inputs[i] = partial(my_run_graph, graph=input_graph)
-            elif FUNCTIONS[FUNCTION_NAME][1].args[i].type == "Funcs":
-                input_graphs = copy.deepcopy(inputs[i])
-
-                my_funcs = {}
-                for j in range(len(input_graphs)):
-                    my_funcs[j] = partial(my_run_graph, graph=input_graphs[j])
-
-                inputs[i] = my_funcs
-
-            # print(f"Input: {input}")
-            # print(f"Func input type: {FUNCTIONS[FUNCTION_NAME][1].args[i].type}")
-            # print(f"Func input default: {FUNCTIONS[FUNCTION_NAME][1].args[i].default}")
-            # print(f"Function arg: {FUNCTIONS[FUNCTION_NAME][1].args[i]}")
-            if input == NULL_VALUE:
-                if (
-                    FUNCTIONS[FUNCTION_NAME][1].args[i].type == "Option"
-                    and FUNCTIONS[FUNCTION_NAME][1].args[i].ty._type == "Bool"
-                    and FUNCTIONS[FUNCTION_NAME][1].args[i].default is None
-                ):
-                    inputs[i] = False
-                else:
-                    inputs[i] = FUNCTIONS[FUNCTION_NAME][1].args[i].default
-        cur_dir = os.getcwd()
-        print("Current directory: ", cur_dir)
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            with change_dir(tmp_dir):
-                # print(f"Running {FUNCTION_NAME} with body {body}")
-                log_message_func = get_log_message_function(dispatcher_url, body["uuid"], token=token)
-                # print(f"Log message function: {log_message_func}")
-
-                if (
-                    len(inputs) > 0
-                    and sum(
-                        [
-                            inputs[i][0] == _RESERVED_BATCH_KEY if type(inputs[i]) == list and len(inputs[i]) > 0 else 0
-                            for i in range(len(inputs))
-                        ]
-                    )
-                    == 1
-                ):
-                    batch_idx = [i for i in range(len(inputs)) if inputs[i][0] == _RESERVED_BATCH_KEY][0]
-                    outputs = [
-                        _RESERVED_BATCH_KEY,
-                        [
-                            FUNCTIONS[FUNCTION_NAME][0](
-                                *(inputs[:i] + batch + inputs[i + 1 :]), log_message=log_message_func
-                            )
-                            for batch in inputs[batch_idx][1]
-                        ],
-                    ]
-                elif len(inputs) > 0 and sum(
-                    [
-                        inputs[i][0] == _RESERVED_BATCH_KEY if type(inputs[i]) == list and len(inputs[i]) > 0 else 0
-                        for i in range(len(inputs))
-                    ]
-                ) == len(inputs):
-                    outputs = [
-                        _RESERVED_BATCH_KEY,
-                        [
-                            FUNCTIONS[FUNCTION_NAME][0](*batch, log_message=log_message_func)
-                            for batch in zip(*[inp[1] for inp in inputs])
-                        ],
-                    ]
-                else:
-                    outputs = FUNCTIONS[FUNCTION_NAME][0](*inputs, log_message=log_message_func)
-                if isinstance(outputs, tuple):
-                    outputs = list(outputs)
-                else:
-                    outputs = [outputs]
-
-                # Convert output files
-                for i, output in enumerate(outputs):
-                    if isinstance(output, OutputFile):
-                        with open(output.path, "rb") as file:
-                            outputs[i] = io.BytesIO(file.read())
-
-                files = {i: output for i, output in enumerate(outputs) if isinstance(output, io.BytesIO)}
-                if len(files) > 0:
-                    form_data = {
-                        "node": body["id"],
-                        "output": json.dumps(
-                            [output if not isinstance(output, io.BytesIO) else "" for output in outputs]
-                        ),
+    def my_run_graph(*args, graph=None, timeout=15 * 60):
+        def call():
+            return run_blue_node(graph, body["id"], dispatcher_url, args, body["uuid"], token=token, timeout=timeout)
+
+        if graph_cache is None or (len(args) == 1 and args[0] == _RESERVED_INPUT_KEY):
+            return call()
+        return graph_cache.get_or_call(GraphCache.key(graph.json, args), call)
+
+    log_message_func = get_log_message_function(dispatcher_url, body["uuid"], token=token)
+
+    error_msg = None
+    # The invocation's socket connection is closed once every invocation using it has finished
+    with manager.holding(body["uuid"]):
+        try:
+            func = FUNCTIONS[FUNCTION_NAME][0]
+            graph_cache = func.graph_cache
+            if func.graph_cache_scope == "invocation":
+                graph_cache = GraphCache(func.graph_cache_size)
+
+            inputs = [inp["value"] for inp in body["node"]["data"]]
+
+            if "input_handles" in body["node"]:
+                for input_idx, i in enumerate(sorted(body["node"]["input_handles"].keys())):
+                    inputs[int(i)] = body["inputs"][input_idx]
+
+            raw_inputs = list(inputs)
+
+            # download all file inputs at once, the decoders check them and pick up the paths
+            decoders = func.decoders
+            file_inputs = {
+                i: input
+                for i, input in enumerate(inputs)
+                if decoders[i].prefetch(input)
+            }
+            downloads = {}
+            if len(file_inputs) > 0:
+                with ThreadPoolExecutor(max_workers=len(file_inputs)) as executor:
+                    downloads = {
+                        i: executor.submit(decoders[i].downloader, record) for i, record in file_inputs.items()
                     }
 
-                    files = {str(i): f for i, f in enumerate(outputs) if isinstance(f, io.BytesIO)}
+            context = DecodeContext(downloads, my_run_graph)
+            inputs = [decoders[i](i, input, context) for i, input in enumerate(inputs)]
+
+            result_cache = func.result_cache
+            cache_key = None
+            hit = False
+            if result_cache is not None:
+                cache_key = result_cache_key(FUNCTION_NAME, raw_inputs, inputs)
+                hit, outputs = result_cache.get(cache_key)
+                if hit:
+                    print(f"Using memoized result for {FUNCTION_NAME}")
+
+            cur_dir = os.getcwd()
+            print("Current directory: ", cur_dir)
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                with change_dir(tmp_dir):
+                    # print(f"Running {FUNCTION_NAME} with body {body}")
+                    if not hit:
+                        batch_positions = [
+                            i
+                            for i, input in enumerate(inputs)
+                            if type(input) == list and len(input) > 0 and input[0] == _RESERVED_BATCH_KEY
+                        ]
+                        if len(batch_positions) == 1:
+                            batch_idx = batch_positions[0]
+                            outputs = [
+                                _RESERVED_BATCH_KEY,
+                                run_batch(
+                                    FUNCTION_NAME,
+                                    [
+                                        inputs[:batch_idx] + batch + inputs[batch_idx + 1 :]
+                                        for batch in inputs[batch_idx][1]
+                                    ],
+                                    log_message_func,
+                                ),
+                            ]
+                        elif len(inputs) > 0 and len(batch_positions) == len(inputs):
+                            outputs = [
+                                _RESERVED_BATCH_KEY,
+                                run_batch(FUNCTION_NAME, zip(*[inp[1] for inp in inputs]), log_message_func),
+                            ]
+                        else:
+                            outputs = func(*inputs, log_message=log_message_func)
+                        if isinstance(outputs, tuple):
+                            outputs = list(outputs)
+                        else:
+                            outputs = [outputs]
+
+                        if cache_key is not None:
+                            result_cache.put(cache_key, outputs)
+
+                    if graph_cache is not None:
+                        print(f"Graph cache: {graph_cache.hits} hits, {graph_cache.misses} misses")
+
+                    # Logs must reach the dispatcher before the node is marked finished
+                    log_message_func.flush()
+
+                    post_outputs(dispatcher_url, body, outputs)
+        except Exception:
+            error_msg = traceback.format_exc()
+            print("Posting error: ", error_msg)
+            log_message_func.flush()
+            response = get_session().post(
+                f"{dispatcher_url}/node_error",
+                headers={"Content-Type": "application/json"},
+                json={
+                    "node": body["id"],
+                    "error": error_msg,
+                },
+            )
+            print(f"Posting error response, status code: {response.status_code}, text: {response.text}")
+    print("Done execute function")
+    return error_msg
 
-                    response = requests.post(f"{dispatcher_url}/node_finished_file", data=form_data, files=files)
 
-                    if response.status_code != 200:
-                        print(f"Failed to call node_finished_file on finish: {response.text}")
-                        raise Exception(f"Failed to call node_finished_file on finish: {response.text}")
-                else:
-                    response = requests.post(
-                        f"{dispatcher_url}/node_finished",
-                        headers={"Content-Type": "application/json"},
-                        json={"node": body["id"], "output": [output for output in outputs]},
-                    )
-
-                    if response.status_code != 200:
-                        print(f"Failed to call node_finished on finish: {response.text}")
-                        raise Exception(f"Failed to call node_finished on finish: {response.text}")
+def iter_job_bodies(source):
+    """Yields ``(item, text)`` for each request body in a JSONL file, a directory of JSON files, or stdin ("-").
+
+    Items are named by line number, or by file name for a directory. Bodies are read lazily, so sources larger than
+    memory are fine.
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith(".json"):
+                with open(os.path.join(source, name), "r") as file:
+                    yield name, file.read()
+        return
+
+    file = sys.stdin if source == "-" else open(source, "r")
+    try:
+        for line_number, line in enumerate(file, start=1):
+            if line.strip():
+                yield f"line {line_number}", line
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def _run_job(item, text):
+    start_time = time.time()
+    node = None
+    try:
+        body = json.loads(text)
+        node = body.get("id")
+        dispatcher_url = body.get("dispatcherurl") or f"http://{os.environ['DISPATCHER_URL']}"
+        error = execute_function(dispatcher_url, body, body["node"]["metadata"]["operator"])
     except Exception:
-        error_msg = traceback.format_exc()
-        print("Posting error: ", error_msg)
-        response = requests.post(
-            f"{dispatcher_url}/node_error",
-            headers={"Content-Type": "application/json"},
-            json={
-                "node": body["id"],
-                "error": error_msg,
-            },
-        )
-        print(f"Posting error response, status code: {response.status_code}, text: {response.text}")
-    print("Done execute function")
+        error = traceback.format_exc()
+    status = {
+        "item": item,
+        "node": node,
+        "status": "ok" if error is None else "error",
+        "seconds": time.time() - start_time,
+    }
+    if error is not None:
+        status["error"] = error
+    return status
+
 
+def run_jobs(source="-", concurrency=1, status_path=None):
+    """Runs many invocations in this process, for batch jobs that would otherwise start a container per node.
+
+    Registered ``setup`` hooks run once up front, and with ``concurrency`` above 1 the bodies are spread over that many
+    worker processes forked afterwards. Failures are posted to the dispatcher as usual and don't stop the run.
+
+    Args:
+        source (str): A JSONL file with one request body per line, a directory of ``.json`` request bodies, or "-" for
+            JSONL on stdin. Defaults to "-".
+        concurrency (int): The number of invocations running at once. Defaults to 1.
+        status_path (Optional[str]): A file to write one JSON status line per item to, as items finish. Defaults to
+            None.
+
+    Returns:
+        dict: The number of items that succeeded and failed.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be a positive integer.")
+
+    load_warm_states()
+    summary = {"succeeded": 0, "failed": 0}
+    status_file = open(status_path, "a") if status_path is not None else None
+
+    def report(status):
+        summary["succeeded" if status["status"] == "ok" else "failed"] += 1
+        # A worker that died has no run time
+        took = "" if status["seconds"] is None else f" in {status['seconds']:.2f} seconds"
+        print(f"Job {status['item']}: {status['status']}{took}", flush=True)
+        if status_file is not None:
+            status_file.write(json.dumps(status) + "\n")
+            status_file.flush()
 
-def run(name: str, port=4823):
+    try:
+        if concurrency == 1:
+            for item, text in iter_job_bodies(source):
+                report(_run_job(item, text))
+            return summary
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=concurrency) as executor:
+            # Bounded, so a large source is never read far ahead of the workers
+            pending = {}
+            for item, text in iter_job_bodies(source):
+                if len(pending) >= 2 * concurrency:
+                    done, _ = futures_wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report(_job_status(future, pending.pop(future)))
+                pending[executor.submit(_run_job, item, text)] = item
+            for future in futures_wait(pending).done:
+                report(_job_status(future, pending[future]))
+        return summary
+    finally:
+        if status_file is not None:
+            status_file.close()
+        print(f"Jobs finished: {summary['succeeded']} succeeded, {summary['failed']} failed", flush=True)
+
+
+def _job_status(future, item):
+    try:
+        return future.result()
+    except Exception as e:
+        # The worker itself died, e.g. it was OOM killed
+        return {"item": item, "node": None, "status": "error", "seconds": None, "error": repr(e)}
+
+
+def warn_process_caches():
+    """Warns about caches that live in process memory, which start empty for every invocation without workers."""
+    for func, config in FUNCTIONS.values():
+        if func.result_cache is not None and func.result_cache.disk is None:
+            print(f"Warning: {config.name} has an in-memory result cache, which only hits when run with workers")
+        if func.graph_cache_scope == "process":
+            print(f'Warning: {config.name} has graph_cache="process", which only hits when run with workers')
+
+
+def run(
+    name: str,
+    port=4823,
+    workers=None,
+    max_in_flight=None,
+    max_queued=None,
+    server_mode=None,
+    threads=16,
+    max_request_size=None,
+    preload=True,
+):
     """Runs the extension. Launches a HTTP server at the specified port for development and port 80 for production.
 
     The generated server satisfies the Oloren Orchestrator Extension API specification.
@@ -672,6 +1802,23 @@ def run(name: str, port=4823):
     Args:
         name (str): A globally unique name for the extension. The name must be a valid javascript variable name.
         port (int): Optional port number for use in development.
+        workers (Optional[int]): Number of long-lived worker processes that run function invocations. Defaults to None,
+            which starts a new process per invocation. Functions that call ``olo.Func`` inputs routed back to this same
+            extension need more workers than concurrently nested calls, otherwise they will wait on each other.
+        max_in_flight (Optional[int]): Without ``workers``, the maximum number of invocations running at once. Further
+            invocations are rejected with a 503 and a Retry-After header. Defaults to None (unlimited).
+        max_queued (Optional[int]): With ``workers``, the maximum number of invocations waiting for a free worker before
+            further invocations are rejected with a 503 and a Retry-After header. Defaults to None (unlimited).
+        server_mode (Optional[str]): "dev" for Flask's debug server with reloading, or "production" for a multi-threaded
+            server with keep-alive that drains running invocations on SIGTERM. Defaults to "production" when the
+            ``MODE`` environment variable is PROD and "dev" otherwise.
+        threads (int): Number of request handling threads in production mode. Defaults to 16. Idle keep-alive
+            connections don't take up a thread.
+        max_request_size (Optional[int]): Largest accepted request body in bytes, larger requests get a 413. Defaults
+            to None (unlimited).
+        preload (bool): Run the ``setup`` hooks of registered functions before serving, so worker processes are forked
+            with the state already loaded and share its memory copy-on-write. With False, each pool worker runs them
+            when it starts, and without ``workers`` each invocation runs them. Defaults to True.
 
     Example::
 
@@ -697,6 +1844,12 @@ def handler(event, context):
         subprocess.run([sys.executable, "-m", "pip", "install", "awslambdaric"], timeout=900)
         return
     elif "MODE" in os.environ and os.environ["MODE"] == "JOB_RUN":
+        if "body" not in os.environ:
+            return run_jobs(
+                os.getenv("OLOREN_JOB_INPUT", "-"),
+                concurrency=int(os.getenv("OLOREN_JOB_CONCURRENCY", "1")),
+                status_path=os.getenv("OLOREN_JOB_STATUS"),
+            )
         # Load the inputs from environment variable
         body = json.loads(os.environ["body"])
         dispatcher_url = body.get("dispatcherurl")
@@ -741,7 +1894,36 @@ def handler(event, context):
 
     port = 80 if os.getenv("MODE") == "PROD" else port
 
-    app.run(host="0.0.0.0", port=port, debug=(os.getenv("MODE") != "PROD"))
+    if server_mode is None:
+        server_mode = "production" if os.getenv("MODE") == "PROD" else "dev"
+    if server_mode not in ("dev", "production"):
+        raise ValueError(f"server_mode must be 'dev' or 'production', got {server_mode!r}.")
+    debug = os.getenv("MODE") != "PROD"
+
+    # The dev server's reloader runs the script again in a child process, which is the one that serves
+    reloader = server_mode == "dev" and debug and os.getenv("WERKZEUG_RUN_MAIN") != "true"
+    if preload and not reloader:
+        load_warm_states()
+
+    from .wsgi import app, prepare_responses, serve
+
+    prepare_responses()
+    worker_pool.configure(
+        workers,
+        max_in_flight=max_in_flight,
+        max_queued=max_queued,
+        initializer=None if preload else load_warm_states,
+    )
+
+    app.config["MAX_CONTENT_LENGTH"] = max_request_size
+
+    if workers is None:
+        warn_process_caches()
+
+    if server_mode == "production":
+        serve(port, threads=threads)
+    else:
+        app.run(host="0.0.0.0", port=port, debug=debug)
 
 
 def handler(event, context):
@@ -786,10 +1968,9 @@ def upload_file(file_path, dispatcher_url=config["DISPATCHER_URL"], token=config
         return
 
     # Open the file in binary mode and upload it
-    with open(file_path, "rb") as f:
-        files = {"file": f}
+    with MultipartStream({}, {"file": (os.path.basename(file_path), file_path)}) as stream:
         upload_url = f"{dispatcher_url}/upload"
-        response = requests.post(upload_url, files=files)
+        response = get_session().post(upload_url, data=stream, headers={"Content-Type": stream.content_type})
 
     # If the request was successful, print the response
     if response.status_code == 200:
@@ -813,10 +1994,9 @@ def upload_file_purl(file_path, dispatcher_url=config["DISPATCHER_URL"]):
         return
 
     # Open the file in binary mode and upload it
-    with open(file_path, "rb") as f:
-        files = {"file": f}
+    with MultipartStream({}, {"file": (os.path.basename(file_path), file_path)}) as stream:
         upload_url = f"{dispatcher_url}/upload_purl"
-        response = requests.post(upload_url, files=files)
+        response = get_session().post(upload_url, data=stream, headers={"Content-Type": stream.content_type})
 
     # If the request was successful, print the response
     if response.status_code == 200:
@@ -826,33 +2006,88 @@ def upload_file_purl(file_path, dispatcher_url=config["DISPATCHER_URL"]):
         print(f"File upload failed with status code: {response.status_code}")
 
 
-def map(lst, fn, batch_size=10):
-    """Convenience function to maps a function over a list of inputs.
+def _map_batches(lst, batch_size):
+    lst = iter(lst)
+    while True:
+        batch = [
+            [x] if not hasattr(x, "__iter__") or isinstance(x, str) else (x if isinstance(x, list) else list(x))
+            for x in itertools.islice(lst, batch_size)
+        ]
+        if len(batch) == 0:
+            return
+        yield batch
+
+
+def imap(lst, fn, batch_size=10, max_in_flight=4, ordered=True):
+    """Lazy version of map that yields results while later batches are still running.
+
+    Up to ``max_in_flight`` batches are sent to ``fn`` at once, and ``lst`` is only consumed as batches are sent, so it
+    may be a generator.
 
     Args:
-        lst (List): The nested list of inputs.
+        lst (Iterable): The nested list of inputs.
         fn (Callable): The function to map over the list.
-        batch_size (Optional[int]): The number of inputs to process in parallel. Defaults to 10. If set to None, will batch all inputs into a single batch.
+        batch_size (Optional[int]): The number of inputs per call to ``fn``. Defaults to 10. If set to None, will batch all inputs into a single batch.
+        max_in_flight (int): The maximum number of batches running at the same time. Defaults to 4.
+        ordered (bool): Defaults to True. If False, batches are yielded in the order they finish rather than the input order.
     """
 
     fn(_RESERVED_INPUT_KEY)
 
     if batch_size is None:
-        batch_size = len(lst)
+        lst = list(lst)
+        batch_size = max(len(lst), 1)
+
+    batches = _map_batches(lst, batch_size)
+
+    def run_batch(batch):
+        return fn([_RESERVED_BATCH_KEY, batch])[0][1]
+
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    pending = deque()
+    try:
+        for batch in itertools.islice(batches, max_in_flight):
+            pending.append(executor.submit(run_batch, batch))
+
+        while len(pending) > 0:
+            if ordered:
+                future = pending.popleft()
+            else:
+                future = next(iter(futures_wait(pending, return_when=FIRST_COMPLETED).done))
+                pending.remove(future)
+            batch_result = future.result()
+
+            for batch in itertools.islice(batches, 1):
+                pending.append(executor.submit(run_batch, batch))
+
+            yield from batch_result
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def map(lst, fn, batch_size=10, max_in_flight=4):
+    """Convenience function to maps a function over a list of inputs.
+
+    Args:
+        lst (List): The nested list of inputs.
+        fn (Callable): The function to map over the list.
+        batch_size (Optional[int]): The number of inputs per call to ``fn``. Defaults to 10. If set to None, will batch all inputs into a single batch.
+        max_in_flight (int): The maximum number of batches running at the same time. Defaults to 4.
+    """
+
+    return list(imap(lst, fn, batch_size=batch_size, max_in_flight=max_in_flight))
 
-    lst = [
-        [x] if not hasattr(x, "__iter__") or isinstance(x, str) else (x if isinstance(x, list) else list(x))
-        for x in lst
-    ]
 
-    batches = [lst[i : i + batch_size] for i in range(0, len(lst), batch_size)]
 
-    results = []
-    for batch in batches:
-        batch_result = fn([_RESERVED_BATCH_KEY, batch])
-        results.extend(batch_result[0][1])
+def __getattr__(name):
+    # The Flask app moved to oloren.wsgi, so that only serving imports Flask
+    if name == "app":
+        from .wsgi import app
 
-    return results
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-__all__ = ["register", "get_log_message_function","config", "run", "handler", "upload_file", "upload_file_purl", "download_from_signed_url", "download_from_file_record", "download_from_registered_file", "map", "set_vars", "app"]
+__all__ = ["register", "get_log_message_function", "ProgressBar","config", "run", "handler", "upload_file", "upload_file_purl", "download_from_signed_url", "download_from_file_record", "download_from_registered_file", "map", "imap", "set_vars", "run_jobs", "ResultCache"]
@@ -141,6 +141,20 @@ class Dir(Type):
 class Func(Type):
     """
     Func: A class for defining a function input.
+
+    The function receives a callable that runs the connected graph with its positional arguments as inputs and returns
+    the graph's output. Pass ``timeout`` to change how long a call waits for the graph, in seconds (15 minutes by
+    default).
+
+    Note:
+        ``timeout`` used to count 5 ms polling iterations, so ``timeout=2000`` meant 10 seconds. It is now a wall-clock
+        limit in seconds, divide old values by 200 to keep the same limit.
+
+    Example::
+
+        @olo.register()
+        def twice(f=olo.Func(), x=olo.Num()):
+            return f(f(x, timeout=60), timeout=60)
     """
 
 
@@ -148,6 +162,9 @@ class Func(Type):
 class Funcs(Type):
     """
     Funcs: A class for defining a list of functions input.
+
+    The function receives a dict from index to callable, each called like a ``Func`` input, including ``timeout`` in
+    seconds.
     """
 
 
@@ -0,0 +1,444 @@
+from flask import Flask, Response, request, send_from_directory, jsonify
+from flask_cors import CORS
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from werkzeug.exceptions import BadRequest, HTTPException, RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.wsgi import LimitedStream
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from functools import partial
+import hashlib
+import traceback
+import threading
+import selectors
+import socket
+import signal
+import json
+import gzip
+import time
+import zlib
+import io
+import os
+import re
+
+from .server import (
+    STATIC_FOLDER,
+    WorkerPoolFull,
+    execute_function,
+    get_directory_json,
+    get_session,
+    process_remoteentry,
+    serialize,
+    worker_pool,
+    zstandard,
+)
+
+try:
+    import brotli
+
+except ImportError:
+    brotli = None
+
+# Content-Encodings accepted for /operator request bodies, advertised on its responses
+REQUEST_ENCODINGS = ["gzip", "zstd"] if zstandard is not None else ["gzip"]
+_DECODE_ERRORS = (ValueError, zlib.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+app = Flask(__name__, static_folder=STATIC_FOLDER)
+app.secret_key = "catcocacolacatdog"
+CORS(app)
+
+
+@app.route("/")
+def health_check():
+    return "OK"
+
+
+# Static assets whose filename contains a content hash never change, so clients may cache them indefinitely
+_HASHED_ASSET = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+
+_RESPONSES = {}
+
+
+class CachedResponse:
+    """A response body computed once and served with an ETag, Last-Modified and precompressed variants.
+
+    Clients are told to revalidate on every use, which costs a 304 with no body while the content is unchanged.
+    """
+
+    def __init__(self, body, content_type, cache_control="no-cache"):
+        self.body = body.encode() if isinstance(body, str) else body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.last_modified = time.time()
+        self.variants = {"gzip": gzip.compress(self.body)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(self.body)
+
+    def response(self):
+        encoding = None
+        for candidate in ("br", "gzip"):
+            if candidate in self.variants and candidate in request.accept_encodings:
+                encoding = candidate
+                break
+
+        response = Response(self.variants[encoding] if encoding else self.body, content_type=self.content_type)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = self.cache_control
+        response.set_etag(self.etag + (f"-{encoding}" if encoding else ""))
+        response.last_modified = self.last_modified
+        return response.make_conditional(request)
+
+
+def cached_response(key, build, version=None):
+    """Returns the CachedResponse stored under ``key``, calling ``build`` to create it on first use and again whenever
+    ``version`` changes."""
+    entry = _RESPONSES.get(key)
+    if entry is None or entry[0] != version:
+        entry = _RESPONSES[key] = (version, build())
+    return entry[1]
+
+
+def directory_response():
+    return CachedResponse(json.dumps(get_directory_json()), "application/json")
+
+
+def remoteentry_response(path):
+    return CachedResponse(process_remoteentry(path), "application/javascript")
+
+
+def remoteentry_version(path):
+    # The file's mtime, so that frontend rebuilds (e.g. by `make dev`) are served without a restart
+    try:
+        return os.stat(os.path.join(app.static_folder, path)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def prepare_responses():
+    """Computes the directory and remoteEntry.js responses, once registration is complete."""
+    _RESPONSES.clear()
+    cached_response("directory", directory_response)
+    if app.static_folder is not None and os.path.exists(os.path.join(app.static_folder, "remoteEntry.js")):
+        cached_response(
+            "remoteEntry.js", partial(remoteentry_response, "remoteEntry.js"), remoteentry_version("remoteEntry.js")
+        )
+
+
+@app.route("/ui/<path:path>")
+def serve_static_files(path):
+    if path.endswith("remoteEntry.js"):
+        return cached_response(path, partial(remoteentry_response, path), remoteentry_version(path)).response()
+
+    response = send_from_directory(app.static_folder, path)
+    if _HASHED_ASSET.search(path):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+@app.route("/directory", methods=["GET"])
+def get_directory():
+    return cached_response("directory", directory_response).response()
+
+
+@app.route("/stats", methods=["GET"])
+def get_stats():
+    return jsonify(worker_pool.stats())
+
+
+def _decompress(data, encoding, max_size=None):
+    """Decompresses a request body, raising a 413 if it inflates to more than ``max_size`` bytes."""
+    if encoding in ("gzip", "x-gzip"):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data = decompressor.decompress(data, max_size + 1 if max_size else 0)
+        if max_size and len(data) > max_size:
+            raise RequestEntityTooLarge()
+        if not decompressor.eof:
+            raise zlib.error("Incomplete gzip stream")
+    else:
+        chunks, size = [], 0
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)) as reader:
+            for chunk in iter(lambda: reader.read(1024 * 1024), b""):
+                chunks.append(chunk)
+                size += len(chunk)
+                if max_size and size > max_size:
+                    break
+        data = b"".join(chunks)
+    if max_size and len(data) > max_size:
+        raise RequestEntityTooLarge()
+    return data
+
+
+def request_json():
+    """Parses the JSON request body, decompressing it according to its Content-Encoding."""
+    if not request.is_json:
+        raise UnsupportedMediaType("Request bodies must be application/json.")
+    encoding = request.headers.get("Content-Encoding", "identity").strip().lower()
+    if encoding not in ["identity", "x-gzip", *REQUEST_ENCODINGS]:
+        raise UnsupportedMediaType(f"Unsupported Content-Encoding {encoding!r}.")
+
+    data = request.get_data(cache=False)
+    try:
+        if encoding != "identity":
+            data = _decompress(data, encoding, max_size=app.config["MAX_CONTENT_LENGTH"])
+        return serialize.loads(data)
+    except _DECODE_ERRORS as e:
+        raise BadRequest(f"Could not decode the request body: {e}")
+
+
+@app.after_request
+def advertise_request_encodings(response):
+    # Lets a dispatcher find out that it may compress the bodies it sends here (RFC 7694)
+    if request.endpoint == "operator":
+        response.headers["Accept-Encoding"] = ", ".join(REQUEST_ENCODINGS)
+    return response
+
+
+@app.route("/operator/<FUNCTION_NAME>", methods=["POST"])
+def operator(FUNCTION_NAME):
+    start_dir = os.getcwd()
+    print("Starting in directory: ", start_dir)
+    try:
+        body = request_json()
+        body["node"]
+        body["inputs"]
+        body["id"]
+
+        DISPATCHER_URL_ = body.get("dispatcherurl") or f"http://{os.environ['DISPATCHER_URL']}"
+
+        try:
+            worker_pool.submit(execute_function, DISPATCHER_URL_, body, FUNCTION_NAME)
+        except WorkerPoolFull as e:
+            # Not a node error, the dispatcher should retry later or route the node elsewhere
+            response = jsonify({"error": str(e), **worker_pool.stats()})
+            response.status_code = 503
+            response.headers["Retry-After"] = str(worker_pool.retry_after())
+            print("Rejecting invocation, worker pool is full")
+            return response
+
+        response = jsonify("Ok")
+        response.status_code = 200
+        print("Returning response")
+        return response
+    except HTTPException:
+        # e.g. a 413 for bodies over max_request_size, the node never started so there is no node error to post
+        raise
+    except Exception:
+        error_msg = traceback.format_exc()
+        get_session().post(
+            f"{DISPATCHER_URL_}/node_error",
+            headers={"Content-Type": "application/json"},
+            json={
+                "node": body["id"],
+                "error": error_msg,
+            },
+        )
+        print("Returning error")
+        return error_msg, 500
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    """Handles one request per call to ``handle``, so that PooledWSGIServer can return the connection to its selector
+    between requests rather than keep a thread blocked on it.
+
+    Werkzeug's handler closes every connection, since after a request it discards whatever the client sent next. This
+    one limits that to the rest of the request body, and keeps the connection alive unless the client asked to close
+    it or sent a chunked body.
+    """
+
+    protocol_version = "HTTP/1.1"
+    max_discarded_body = 1024 * 1024
+
+    def __init__(self, request, client_address, server):
+        self.request = request
+        self.client_address = client_address
+        self.server = server
+        self.setup()
+        self.connection_rfile = self.rfile
+        self.body = None
+
+    def handle(self):
+        self.close_connection = True
+        self.rfile = self.connection_rfile
+        self.body = None
+        try:
+            self.handle_one_request()
+        except (ConnectionError, socket.timeout) as e:
+            self.connection_dropped(e)
+            self.close_connection = True
+        finally:
+            self.rfile = self.connection_rfile
+        if self.body is not None and not self.body.is_exhausted and not self.close_connection:
+            # Discards what the application didn't read of the body, unless closing is cheaper
+            try:
+                while not self.body.is_exhausted and self.body.tell() < self.max_discarded_body:
+                    self.body.read(64 * 1024)
+            except Exception:
+                pass
+            self.close_connection = not self.body.is_exhausted
+
+    def make_environ(self):
+        environ = super().make_environ()
+        if environ.get("wsgi.input_terminated"):
+            self.close_connection = True
+        else:
+            self.body = LimitedStream(self.rfile, int(environ.get("CONTENT_LENGTH") or 0))
+            environ["wsgi.input"] = self.rfile = self.body
+        return environ
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == "connection" and value.lower() == "close" and not self.close_connection:
+            value = "keep-alive"
+        super().send_header(keyword, value)
+
+    def has_buffered_request(self):
+        """Whether the client already sent (part of) its next request, which the selector would not report."""
+        self.connection.setblocking(False)
+        try:
+            return len(self.connection_rfile.peek(1)) > 0
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """A WSGI server for production that handles requests on a fixed pool of threads.
+
+    Connections are kept alive between requests for up to ``keep_alive_timeout`` seconds of inactivity. Idle
+    connections wait in a selector rather than on a thread, so only connections with a request to read take up one of
+    the ``threads``, however many clients keep connections open. Closing the server waits for requests that are already
+    being handled.
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads=16, keep_alive_timeout=5):
+        handler = type("PooledRequestHandler", (PooledRequestHandler,), {"timeout": keep_alive_timeout})
+        super().__init__(host, port, app, handler=handler)
+        self.keep_alive_timeout = keep_alive_timeout
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.closing = False
+        self.selector = selectors.DefaultSelector()
+        # Connections handed back by the pool, registered by the selector thread, which a byte on the waker wakes up
+        self.returned = deque()
+        self.returned_lock = threading.Lock()
+        self.waker, self.waker_signal = socket.socketpair()
+        self.selector.register(self.waker, selectors.EVENT_READ)
+        self.selector_thread = threading.Thread(target=self._watch_idle, daemon=True)
+        self.selector_thread.start()
+
+    def process_request(self, request, client_address):
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            return
+        self._submit(handler)
+
+    def _submit(self, handler):
+        try:
+            self.executor.submit(self._handle, handler)
+        except RuntimeError:
+            # The pool has been shut down
+            self._close(handler)
+
+    def _handle(self, handler):
+        try:
+            handler.handle()
+        except Exception:
+            self.handle_error(handler.request, handler.client_address)
+            handler.close_connection = True
+
+        if handler.close_connection or self.closing:
+            self._close(handler)
+        elif handler.has_buffered_request():
+            self._submit(handler)
+        else:
+            with self.returned_lock:
+                self.returned.append(handler)
+            self._wake()
+
+    def _close(self, handler):
+        try:
+            handler.finish()
+        except Exception:
+            pass
+        self.shutdown_request(handler.request)
+
+    def _wake(self):
+        try:
+            self.waker_signal.send(b"\0")
+        except OSError:
+            pass
+
+    def _watch_idle(self):
+        deadlines = {}
+        while not self.closing:
+            now = time.monotonic()
+            timeout = max(0, min(deadlines.values()) - now) if len(deadlines) > 0 else None
+            for key, _ in self.selector.select(timeout):
+                if key.fileobj is self.waker:
+                    self.waker.recv(4096)
+                    continue
+                self.selector.unregister(key.fileobj)
+                del deadlines[key.data]
+                self._submit(key.data)
+
+            with self.returned_lock:
+                returned, self.returned = self.returned, deque()
+            for handler in returned:
+                self.selector.register(handler.connection, selectors.EVENT_READ, handler)
+                deadlines[handler] = time.monotonic() + self.keep_alive_timeout
+
+            now = time.monotonic()
+            for handler in [handler for handler, deadline in deadlines.items() if deadline <= now]:
+                self.selector.unregister(handler.connection)
+                del deadlines[handler]
+                self._close(handler)
+
+        for handler in list(deadlines) + list(self.returned):
+            self._close(handler)
+
+    def server_close(self):
+        super().server_close()
+        if self.closing:
+            return
+        # Requests being handled finish and close their connections, idle connections are closed right away
+        self.closing = True
+        self._wake()
+        self.selector_thread.join()
+        self.executor.shutdown(wait=True)
+        with self.returned_lock:
+            returned, self.returned = self.returned, deque()
+        for handler in returned:
+            self._close(handler)
+        self.selector.close()
+        self.waker.close()
+        self.waker_signal.close()
+
+
+def serve(port, threads=16):
+    """Serves the app with a PooledWSGIServer until SIGTERM or SIGINT.
+
+    On shutdown, the server stops accepting connections, finishes the requests it is handling, and then waits for
+    every accepted invocation to finish running.
+    """
+    server = PooledWSGIServer("0.0.0.0", port, app, threads=threads)
+
+    def stop(signum, frame):
+        print("Shutting down, waiting for running invocations to finish...", flush=True)
+        # shutdown() blocks until serve_forever returns, which can't happen while this handler runs on its thread
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"Serving on port {port} with {threads} threads", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        worker_pool.shutdown(wait=True)
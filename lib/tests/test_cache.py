@@ -0,0 +1,107 @@
+import io
+import os
+
+import oloren as olo
+from oloren import server
+from oloren.cache import FileCache, ResultCache, link_or_copy
+
+
+def test_result_cache_round_trip():
+    cache = ResultCache()
+    assert cache.get("k") == (False, None)
+    assert cache.put("k", [1, {"a": [2, 3]}])
+    assert cache.get("k") == (True, [1, {"a": [2, 3]}])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_result_cache_refuses_output_files():
+    cache = ResultCache()
+    assert not cache.put("file", [olo.OutputFile("out.csv")])
+    assert not cache.put("bytes", [io.BytesIO(b"data")])
+    assert cache.get("file") == (False, None)
+    assert cache.get("bytes") == (False, None)
+
+
+def test_memoized_function_still_uploads_output_files(monkeypatch, tmp_path):
+    posted = []
+    monkeypatch.setattr(server, "post_outputs", lambda dispatcher_url, body, outputs: posted.append(outputs))
+
+    @olo.register(cache=True)
+    def write_file(text=olo.String()):
+        with open("out.csv", "w") as file:
+            file.write(text)
+        return olo.OutputFile("out.csv")
+
+    body = {"node": {"token": None, "data": [{"value": "a,b"}]}, "inputs": [], "id": "n1", "uuid": "u"}
+    for _ in range(2):
+        assert server.execute_function("http://127.0.0.1:9", body, "write_file") is None
+
+    assert [type(outputs[0]) for outputs in posted] == [olo.OutputFile, olo.OutputFile]
+
+
+def write_bytes(size):
+    def fill(path):
+        with open(path, "wb") as file:
+            file.write(b"x" * size)
+
+    return fill
+
+
+def test_file_cache_keeps_entry_larger_than_budget(tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=10)
+    path = cache.get_or_put("big", write_bytes(100))
+    assert os.path.getsize(path) == 100
+
+    # The next insert evicts it, but never the entry being inserted
+    cache.put("small", write_bytes(5))
+    assert cache.get("big") is None
+    assert cache.get("small") is not None
+
+
+def test_file_cache_evicts_least_recently_used(tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=25)
+    cache.put("a", write_bytes(10))
+    cache.put("b", write_bytes(10))
+    os.utime(cache.path("a"), (0, 0))
+    cache.put("c", write_bytes(10))
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+
+
+def test_download_input_redownloads_after_concurrent_eviction(monkeypatch, tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=1024)
+    monkeypatch.setattr(server, "file_cache", cache)
+    monkeypatch.setattr(server, "_download_to", lambda url, path: write_bytes(10)(path))
+
+    evicted = []
+
+    def link_after_eviction(src, dst=None):
+        if not evicted:
+            evicted.append(src)
+            os.remove(src)
+        return link_or_copy(src, dst)
+
+    monkeypatch.setattr(server, "link_or_copy", link_after_eviction)
+    path = server.download_input({"url": "http://files/a.txt", "key": "a.txt"})
+    assert os.path.getsize(path) == 10
+    os.remove(path)
+
+
+def test_process_caches_are_warned_about(capsys, tmp_path):
+    @olo.register(name="In Memory", cache=True)
+    def in_memory(x=olo.Num()):
+        return x
+
+    @olo.register(name="On Disk", cache=ResultCache(directory=str(tmp_path)))
+    def on_disk(x=olo.Num()):
+        return x
+
+    @olo.register(name="Graph Cached", graph_cache="process")
+    def graph_cached(f=olo.Func()):
+        return f()
+
+    server.warn_process_caches()
+    warnings = capsys.readouterr().out
+    assert "In Memory has an in-memory result cache" in warnings
+    assert "On Disk" not in warnings
+    assert 'Graph Cached has graph_cache="process"' in warnings
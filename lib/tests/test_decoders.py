@@ -0,0 +1,92 @@
+from concurrent.futures import Future
+
+import pytest
+
+import oloren as olo
+from oloren import server
+from oloren.types import NULL_VALUE
+
+
+def decoders(name):
+    return server.FUNCTIONS[name][0].decoders
+
+
+def done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_null_inputs_decode_to_their_defaults():
+    @olo.register()
+    def optional_inputs(
+        n=olo.Num(),
+        flag=olo.Option(olo.Bool()),
+        number=olo.Option(olo.Num()),
+        named=olo.Option(olo.String(), default="x"),
+        f=olo.Func(),
+    ):
+        pass
+
+    context = server.DecodeContext({}, None)
+    assert [decode(i, NULL_VALUE, context) for i, decode in enumerate(decoders("optional_inputs"))] == [
+        None,
+        False,
+        None,
+        "x",
+        None,
+    ]
+    n, flag = decoders("optional_inputs")[:2]
+    assert (n(0, 1, context), flag(1, True, context)) == (1, True)
+
+
+def test_func_inputs_decode_to_graph_calls():
+    @olo.register()
+    def graph_inputs(f=olo.Func(), fs=olo.Funcs()):
+        pass
+
+    calls = []
+    context = server.DecodeContext({}, lambda *args, graph=None: calls.append((args, graph)) or len(calls))
+    decode_f, decode_fs = decoders("graph_inputs")
+
+    f = decode_f(0, {"output_ids": [{"id": 1}]}, context)
+    assert f(2, 3) == 1
+    fs = decode_fs(1, [{"output_ids": []}, {"output_ids": [{"id": 2}]}], context)
+    assert sorted(fs) == [0, 1]
+    assert fs[1]("a") == 2
+
+    assert [(args, type(graph), graph.graph) for args, graph in calls] == [
+        ((2, 3), server.GraphTemplate, {"output_ids": [{"id": 1}]}),
+        (("a",), server.GraphTemplate, {"output_ids": [{"id": 2}]}),
+    ]
+
+
+def test_file_inputs_are_prefetched():
+    @olo.register()
+    def file_inputs(path=olo.File(), directory=olo.Dir()):
+        pass
+
+    decode_file, decode_dir = decoders("file_inputs")
+    record = {"url": "https://bucket/input"}
+    assert decode_file.prefetch(record) and decode_dir.prefetch(record)
+    assert (decode_file.downloader, decode_dir.downloader) == (server.download_input, server.download_dir_input)
+
+    context = server.DecodeContext({0: done("/tmp/input")}, None)
+    assert decode_file(0, record, context) == "/tmp/input"
+    with pytest.raises(AssertionError, match="File inputs must be signed URLs"):
+        decode_file(0, NULL_VALUE, context)
+    with pytest.raises(AssertionError, match="Directory inputs must be signed URLs"):
+        decode_dir(1, "not a record", context)
+
+
+def test_spilled_outputs_are_prefetched():
+    @olo.register()
+    def json_input(value=olo.Json()):
+        pass
+
+    (decode,) = decoders("json_input")
+    spilled = {"url": "https://bucket/output0.olo.json.gz?signature=1"}
+    assert decode.prefetch(spilled)
+    assert not decode.prefetch({"url": "https://bucket/data.json"})
+    assert decode.downloader is server.download_spilled_output
+    assert decode(0, spilled, server.DecodeContext({0: done([1, 2])}, None)) == [1, 2]
@@ -0,0 +1,140 @@
+import io
+import re
+import sys
+import tempfile
+import zipfile
+
+import pytest
+import requests
+
+from oloren import server
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start : start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class RangeSession:
+    """Serves ``data`` like S3: ranges get a 206, and any range of an empty object a 416."""
+
+    def __init__(self, data):
+        self.data = data
+        self.ranges = []
+
+    def get(self, url, stream=False, headers=None):
+        requested = (headers or {}).get("Range")
+        self.ranges.append(requested)
+        if requested is None:
+            return FakeResponse(200, self.data)
+        if len(self.data) == 0:
+            return FakeResponse(416, headers={"Content-Range": "bytes */0"})
+        start, end = map(int, re.match(r"bytes=(\d+)-(\d+)", requested).groups())
+        end = min(end, len(self.data) - 1)
+        return FakeResponse(
+            206, self.data[start : end + 1], {"Content-Range": f"bytes {start}-{end}/{len(self.data)}"}
+        )
+
+
+def test_download_empty_object(monkeypatch, tmp_path):
+    session = RangeSession(b"")
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    path = tmp_path / "empty"
+    server._download_to("https://bucket/empty", str(path))
+    assert path.read_bytes() == b""
+    assert session.ranges == [f"bytes=0-{server.DOWNLOAD_PART_SIZE - 1}", None]
+
+
+def test_download_in_parallel_parts(monkeypatch, tmp_path):
+    data = bytes(range(256)) * 40
+    session = RangeSession(data)
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    monkeypatch.setattr(server, "DOWNLOAD_PART_SIZE", 1000)
+    path = tmp_path / "data"
+    server._download_to("https://bucket/data", str(path))
+    assert path.read_bytes() == data
+    assert len(session.ranges) == 11
+
+
+def test_short_first_part_fails(monkeypatch, tmp_path):
+    class ShortSession(RangeSession):
+        def get(self, url, stream=False, headers=None):
+            response = super().get(url, stream=stream, headers=headers)
+            if len(self.ranges) == 1:
+                response.body = response.body[:500]
+            return response
+
+    monkeypatch.setattr(server, "get_session", lambda: ShortSession(bytes(range(256)) * 40))
+    monkeypatch.setattr(server, "DOWNLOAD_PART_SIZE", 1000)
+    with pytest.raises(Exception, match="Incomplete download of bytes 0-999"):
+        server._download_to("https://bucket/data", str(tmp_path / "data"))
+
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(zipfile.ZipInfo(name), data)
+    return buffer.getvalue()
+
+
+def test_dir_is_extracted_while_streaming(monkeypatch, tmp_path):
+    pytest.importorskip("stream_unzip")
+    session = RangeSession(zip_bytes({"top.txt": b"top", "nested/": b"", "nested/inner.txt": b"inner"}))
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    server._extract_to("https://bucket/dir.zip", str(tmp_path / "dir"))
+    assert (tmp_path / "dir" / "top.txt").read_bytes() == b"top"
+    assert (tmp_path / "dir" / "nested" / "inner.txt").read_bytes() == b"inner"
+    # A single streamed request, rather than a ranged download to disk
+    assert session.ranges == [None]
+
+
+def test_streamed_member_paths_stay_inside_the_dir(monkeypatch, tmp_path):
+    pytest.importorskip("stream_unzip")
+    members = {"../escaped.txt": b"a", "/absolute.txt": b"b", "sub\\..\\..\\windows.txt": b"c"}
+    monkeypatch.setattr(server, "get_session", lambda: RangeSession(zip_bytes(members)))
+    server._extract_to("https://bucket/dir.zip", str(tmp_path / "dir"))
+    assert sorted(str(path.relative_to(tmp_path)) for path in tmp_path.rglob("*.txt")) == [
+        "dir/absolute.txt",
+        "dir/escaped.txt",
+        "dir/sub/windows.txt",
+    ]
+
+
+@pytest.mark.parametrize("stream_unzip", ["missing", "failing"])
+def test_dir_extraction_falls_back_to_a_full_download(monkeypatch, tmp_path, stream_unzip):
+    if stream_unzip == "missing":
+        monkeypatch.setitem(sys.modules, "stream_unzip", None)
+    else:
+        module = pytest.importorskip("stream_unzip")
+
+        def fail(chunks):
+            yield b"partial.txt", None, iter([next(iter(chunks))])
+            raise ValueError("Not a streamable zip")
+
+        monkeypatch.setattr(module, "stream_unzip", fail)
+    session = RangeSession(zip_bytes({"a.txt": b"a", "nested/b.txt": b"b"}))
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    server._extract_to("https://bucket/dir.zip", str(tmp_path / "dir"))
+    assert sorted(str(path.relative_to(tmp_path / "dir")) for path in (tmp_path / "dir").rglob("*.txt")) == [
+        "a.txt",
+        "nested/b.txt",
+    ]
+    assert f"bytes=0-{server.DOWNLOAD_PART_SIZE - 1}" in session.ranges
+    # The archive is removed once extracted
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["dir"]
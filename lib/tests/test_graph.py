@@ -0,0 +1,58 @@
+import json
+
+import oloren as olo
+from oloren import server
+from oloren.cache import GraphCache
+from oloren.types import NULL_VALUE
+
+
+def test_graph_template_render():
+    template = server.GraphTemplate({"id": "old", "input_ids": [], "output_ids": [{"id": 4}], "operator": "x"})
+    graph = json.loads(template.render("u", [1, {"a": 2}]))
+    assert graph[0] == {
+        "id": "u-graph",
+        "input_ids": [{"id": 5}, {"id": 6}],
+        "output_ids": [{"id": 4}],
+        "operator": "x",
+    }
+    assert [(element["id"], element["data"]) for element in graph[1:]] == [("u-input-0", 1), ("u-input-1", {"a": 2})]
+    assert json.loads(template.render("v", [])) == [{**graph[0], "id": "v-graph", "input_ids": []}]
+
+
+def test_graph_template_is_built_on_first_use():
+    template = server.GraphTemplate({"output_ids": []})
+    assert not template.prepared
+
+
+def test_graph_cache_key_is_only_built_when_asked_for():
+    template = server.GraphTemplate({"output_ids": [{"id": 1}], "b": 1, "a": 2})
+    template.render("u", [1])
+    assert template._json is None
+    assert template.json == '{"a": 2, "b": 1, "output_ids": [{"id": 1}]}'
+
+
+def test_unset_and_uncalled_func_inputs(monkeypatch):
+    posted = []
+    monkeypatch.setattr(server, "post_outputs", lambda dispatcher_url, body, outputs: posted.append(outputs))
+
+    @olo.register()
+    def maybe_call(f=olo.Func(), g=olo.Func()):
+        return [f is None, callable(g)]
+
+    data = [{"value": NULL_VALUE}, {"value": {"output_ids": []}}]
+    body = {"node": {"token": None, "data": data}, "inputs": [], "id": "n1", "uuid": "u"}
+    assert server.execute_function("http://127.0.0.1:9", body, "maybe_call") is None
+    assert posted == [[[True, True]]]
+
+
+def test_graph_cache_coalesces_calls():
+    cache = GraphCache(max_entries=2)
+    calls = []
+    key = GraphCache.key("{}", [1])
+    assert cache.get_or_call(key, lambda: calls.append(1) or "result") == "result"
+    assert cache.get_or_call(key, lambda: calls.append(1) or "other") == "result"
+    assert calls == [1]
+    assert (cache.hits, cache.misses) == (1, 1)
+    for i in range(3):
+        cache.get_or_call(GraphCache.key("{}", [i + 2]), lambda: i)
+    assert len(cache.results) == 2
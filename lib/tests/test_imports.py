@@ -0,0 +1,20 @@
+import json
+import subprocess
+import sys
+
+SERVING_MODULES = ["flask", "flask_cors", "socketio", "multiprocessing", "concurrent.futures.process"]
+
+
+def test_import_oloren_skips_serving_modules():
+    code = f"import json, sys, oloren; print(json.dumps([m for m in {SERVING_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout.splitlines()[-1]) == []
+
+
+def test_app_is_importable_from_server():
+    from oloren import wsgi
+    from oloren.server import app
+    import oloren
+
+    assert app is wsgi.app
+    assert oloren.app is wsgi.app
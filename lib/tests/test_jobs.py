@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+
+import oloren as olo
+from oloren import server
+
+
+class RecordingSession:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, data=None, headers=None, json=None, **kwargs):
+        self.posts.append(url.rsplit("/", 1)[-1])
+        return type("Response", (), {"status_code": 200, "text": "ok"})()
+
+
+@olo.register()
+def job_double(x=olo.Num()):
+    return 2 * x
+
+
+@olo.register()
+def job_fail(x=olo.Num()):
+    raise ValueError("bad input")
+
+
+@olo.register()
+def job_crash(x=olo.Num()):
+    os._exit(1)
+
+
+def job_body(operator, node, x=1):
+    return json.dumps(
+        {
+            "node": {"token": None, "data": [{"value": x}], "metadata": {"operator": operator}},
+            "inputs": [],
+            "id": node,
+            "uuid": f"u-{node}",
+            "dispatcherurl": "http://dispatcher",
+        }
+    )
+
+
+@pytest.fixture(autouse=True)
+def session(monkeypatch):
+    session = RecordingSession()
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    return session
+
+
+@pytest.mark.parametrize("concurrency", [1, 2])
+def test_jobs_report_a_status_per_item(tmp_path, concurrency):
+    source = tmp_path / "jobs.jsonl"
+    lines = [job_body("job_double", "n1"), "", job_body("job_fail", "n2"), "not json", job_body("job_double", "n3")]
+    source.write_text("\n".join(lines) + "\n")
+    status_path = tmp_path / "status.jsonl"
+
+    summary = server.run_jobs(str(source), concurrency=concurrency, status_path=str(status_path))
+
+    assert summary == {"succeeded": 2, "failed": 2}
+    statuses = sorted((json.loads(line) for line in status_path.read_text().splitlines()), key=lambda s: s["item"])
+    assert [(status["item"], status["node"], status["status"]) for status in statuses] == [
+        ("line 1", "n1", "ok"),
+        ("line 3", "n2", "error"),
+        ("line 4", None, "error"),
+        ("line 5", "n3", "ok"),
+    ]
+    assert "bad input" in statuses[1]["error"]
+    assert all(status["seconds"] >= 0 for status in statuses)
+
+
+def test_jobs_from_a_directory(tmp_path, session):
+    (tmp_path / "b.json").write_text(job_body("job_double", "n2"))
+    (tmp_path / "a.json").write_text(job_body("job_double", "n1"))
+    (tmp_path / "notes.txt").write_text("ignored")
+    assert server.run_jobs(str(tmp_path)) == {"succeeded": 2, "failed": 0}
+    assert session.posts.count("node_finished") == 2
+
+
+def test_a_crashed_worker_fails_its_items(tmp_path):
+    source = tmp_path / "jobs.jsonl"
+    source.write_text(job_body("job_crash", "n1") + "\n")
+    status_path = tmp_path / "status.jsonl"
+
+    summary = server.run_jobs(str(source), concurrency=2, status_path=str(status_path))
+
+    assert summary == {"succeeded": 0, "failed": 1}
+    (status,) = [json.loads(line) for line in status_path.read_text().splitlines()]
+    assert (status["item"], status["status"], status["seconds"]) == ("line 1", "error", None)
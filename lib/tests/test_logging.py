@@ -0,0 +1,59 @@
+import oloren as olo
+from oloren import server
+
+
+class RecordingSession:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, data=None, headers=None, json=None, **kwargs):
+        self.posts.append((url.rsplit("/", 1)[-1], json))
+        return type("Response", (), {"status_code": 200, "text": "ok"})()
+
+
+def test_messages_are_batched_in_order(monkeypatch):
+    session = RecordingSession()
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    shipper = server.LogShipper("http://dispatcher", "u1", max_batch=3, flush_interval=5)
+    for i in range(7):
+        shipper.log(1, str(i))
+    shipper.log(2, "warning")
+    shipper.flush()
+
+    assert [(body["level"], body["data"]["message"]) for _, body in session.posts] == [
+        (1, "0\n1\n2"),
+        (1, "3\n4\n5"),
+        (1, "6"),
+        (2, "warning"),
+    ]
+    assert {(path, body["uuid"]) for path, body in session.posts} == {("node_progress", "u1")}
+
+
+def test_logging_again_after_a_flush(monkeypatch):
+    session = RecordingSession()
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    shipper = server.LogShipper("http://dispatcher", "u1")
+    shipper.log(1, "first")
+    shipper.flush()
+    shipper.log(1, "second")
+    shipper.flush()
+    assert [body["data"]["message"] for _, body in session.posts] == ["first", "second"]
+
+
+def test_messages_are_delivered_before_the_node_finishes(monkeypatch):
+    session = RecordingSession()
+    monkeypatch.setattr(server, "get_session", lambda: session)
+
+    @olo.register()
+    def chatty(n=olo.Num(), log_message=print):
+        for i in range(n):
+            log_message(f"step {i}")
+        return n
+
+    body = {"node": {"token": None, "data": [{"value": 250}]}, "inputs": [], "id": "n1", "uuid": "u1"}
+    assert server.execute_function("http://dispatcher", body, "chatty") is None
+
+    paths = [path for path, _ in session.posts]
+    assert paths[-1] == "node_finished"
+    messages = "\n".join(body["data"]["message"] for path, body in session.posts if path == "node_progress")
+    assert messages.split("\n") == [f"step {i}" for i in range(250)]
@@ -0,0 +1,47 @@
+import threading
+import time
+
+from oloren import server
+
+
+def batch_function(delays=None, calls=None):
+    """Stands in for a Func, returning each input doubled. Batches wait ``delays[first input]`` seconds."""
+    lock = threading.Lock()
+
+    def fn(inputs):
+        if inputs == server._RESERVED_INPUT_KEY:
+            return None
+        _, batch = inputs
+        if calls is not None:
+            with lock:
+                calls.append(batch)
+        time.sleep((delays or {}).get(batch[0][0], 0))
+        return [[None, [x * 2 for x, in batch]]]
+
+    return fn
+
+
+def test_map_keeps_input_order():
+    fn = batch_function(delays={0: 0.2})
+    assert server.map(range(10), fn, batch_size=3) == [x * 2 for x in range(10)]
+
+
+def test_imap_unordered_yields_finished_batches_first():
+    fn = batch_function(delays={0: 0.5})
+    results = list(server.imap(range(4), fn, batch_size=2, ordered=False))
+    assert results == [4, 6, 0, 2]
+
+
+def test_imap_consumes_lazily():
+    calls = []
+    results = server.imap((x for x in range(100)), batch_function(calls=calls), batch_size=10, max_in_flight=2)
+    assert next(results) == 0
+    time.sleep(0.1)
+    assert len(calls) <= 3
+    results.close()
+
+
+def test_map_single_batch():
+    calls = []
+    assert server.map(range(5), batch_function(calls=calls), batch_size=None) == [0, 2, 4, 6, 8]
+    assert calls == [[[0], [1], [2], [3], [4]]]
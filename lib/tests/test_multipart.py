@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+from oloren import server
+from test_spill import multipart_parts
+
+
+def test_multipart_stream_parts(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"from a path" * 1000)
+    stream = server.MultipartStream(
+        {"node": "n1", "index": 2},
+        {"path": str(path), "buffer": io.BytesIO(b"from a buffer"), "named": ("out.txt", io.BytesIO(b"named"))},
+    )
+    with stream:
+        body = stream.read()
+    assert len(body) == len(stream)
+    assert multipart_parts({"Content-Type": stream.content_type}, body) == {
+        "node": (None, b"n1"),
+        "index": (None, b"2"),
+        "path": ("path", b"from a path" * 1000),
+        "buffer": ("buffer", b"from a buffer"),
+        "named": ("out.txt", b"named"),
+    }
+
+
+def test_multipart_stream_reads_in_chunks():
+    data = bytes(range(256)) * 100
+    stream = server.MultipartStream({"node": "n1"}, {"file": io.BytesIO(data)})
+    chunks = list(iter(lambda: stream.read(1000), b""))
+    assert all(len(chunk) == 1000 for chunk in chunks[:-1])
+    body = b"".join(chunks)
+    assert len(body) == len(stream)
+    assert multipart_parts({"Content-Type": stream.content_type}, body) == {
+        "node": (None, b"n1"),
+        "file": ("file", data),
+    }
+
+
+def test_multipart_stream_length_starts_at_file_position():
+    file = io.BytesIO(b"skipped" + b"sent")
+    file.seek(len(b"skipped"))
+    stream = server.MultipartStream({}, {"file": file})
+    body = stream.read()
+    assert len(body) == len(stream)
+    assert multipart_parts({"Content-Type": stream.content_type}, body) == {"file": ("file", b"sent")}
+
+
+def test_multipart_stream_closes_files_when_a_later_one_is_missing(monkeypatch, tmp_path):
+    opened = []
+
+    def tracking_open(*args, **kwargs):
+        opened.append(open(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(server, "open", tracking_open, raising=False)
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"data")
+    with pytest.raises(FileNotFoundError):
+        server.MultipartStream({}, {"path": str(path), "missing": str(tmp_path / "missing")})
+    assert len(opened) == 1 and opened[0].closed
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+import oloren as olo
+from oloren import server
+
+
+class RecordingSession:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, data=None, headers=None, json=None, **kwargs):
+        self.posts.append(json)
+        return type("Response", (), {"status_code": 200, "text": "ok"})()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = RecordingSession()
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    return session
+
+
+def increments(session):
+    return [k for body in session.posts for key, k in body["data"].items() if key != "numItems"]
+
+
+def test_increments_are_coalesced(session):
+    log_message = server.get_log_message_function("http://dispatcher", "u1", None)
+    bar = olo.ProgressBar(1000, log_message, min_interval=5)
+    for _ in range(1000):
+        bar.increment()
+    # Nothing but the total is sent while incrementing
+    assert [body["data"] for body in session.posts] == [{"numItems": 1000}]
+    bar.close()
+    assert increments(session) == [1000]
+    assert {body["progressId"] for body in session.posts} == {bar.progress_uuid}
+
+
+def test_updates_are_sent_every_interval(session):
+    log_message = server.get_log_message_function("http://dispatcher", "u1", None)
+    with olo.ProgressBar(10, log_message, min_interval=0.05) as bar:
+        bar.increment(3)
+        time.sleep(0.3)
+        assert increments(session) == [3]
+        bar.increment(7)
+    assert increments(session) == [3, 7]
+
+
+def test_iterating_over_a_progress_bar(session):
+    log_message = server.get_log_message_function("http://dispatcher", "u1", None)
+    bar = olo.ProgressBar(5, log_message, iterable=range(5), min_interval=5)
+    assert list(bar) == [0, 1, 2, 3, 4]
+    assert bar.closed.is_set()
+    assert sum(increments(session)) == 5
+
+
+def test_flushing_the_log_sends_pending_increments(session):
+    log_message = server.get_log_message_function("http://dispatcher", "u1", None)
+    bar = olo.ProgressBar(3, log_message, min_interval=5)
+    bar.increment(3)
+    log_message.flush()
+    assert increments(session) == [3]
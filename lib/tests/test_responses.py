@@ -0,0 +1,69 @@
+import gzip
+import os
+
+import pytest
+
+from oloren import server, wsgi
+
+
+@pytest.fixture
+def static(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "STATIC_FOLDER", str(tmp_path))
+    monkeypatch.setattr(wsgi.app, "static_folder", str(tmp_path))
+    monkeypatch.setattr(server, "EXTENSION_NAME", "ext")
+    monkeypatch.setattr(wsgi, "_RESPONSES", {})
+    (tmp_path / "remoteEntry.js").write_text("var EXTENSIONNAME; EXTENSIONNAME.init()")
+    return tmp_path
+
+
+@pytest.fixture
+def client():
+    return wsgi.app.test_client()
+
+
+def test_etag_and_not_modified(client, static):
+    response = client.get("/directory")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+    etag = response.headers["ETag"]
+
+    revalidated = client.get("/directory", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+
+def test_gzip_variant(client, static):
+    plain = client.get("/ui/remoteEntry.js")
+    assert plain.data == b"var ext; ext.init()"
+    assert "Content-Encoding" not in plain.headers
+
+    compressed = client.get("/ui/remoteEntry.js", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(compressed.data) == plain.data
+    # Each variant has its own ETag, so caches never serve one for the other
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+    assert client.get(
+        "/ui/remoteEntry.js", headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["ETag"]}
+    ).status_code == 304
+
+
+def test_brotli_variant(client, static):
+    if wsgi.brotli is None:
+        pytest.skip("brotli is not installed")
+    response = client.get("/ui/remoteEntry.js", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert wsgi.brotli.decompress(response.data) == b"var ext; ext.init()"
+
+
+def test_rebuilt_remoteentry_is_served(client, static):
+    wsgi.prepare_responses()
+    first = client.get("/ui/remoteEntry.js")
+    path = static / "remoteEntry.js"
+    path.write_text("var EXTENSIONNAME; EXTENSIONNAME.rebuilt()")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    second = client.get("/ui/remoteEntry.js", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.data == b"var ext; ext.rebuilt()"
@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+
+import pytest
+
+from oloren import server
+from test_sockets import FakeSocket
+
+GRAPH = {"id": "g", "operator": "x", "input_ids": [], "output_ids": [{"id": 1}]}
+
+
+class GraphSession:
+    """Records /run_graph posts, answering each with ``statuses`` in turn and then finishing the graph from another
+    thread if ``output`` is set."""
+
+    def __init__(self, manager, statuses=(), output=None):
+        self.manager = manager
+        self.statuses = list(statuses)
+        self.output = output
+        self.posts = []
+
+    def post(self, url, data=None, headers=None, **kwargs):
+        graph_id = json.loads(data)["graph"][0]["id"]
+        self.posts.append(graph_id)
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status == 200 and self.output is not None:
+            event = {"status": "finished", "data": {"id": graph_id, "output_ids": [{"id": 1}]}, "output": self.output}
+            threading.Timer(0.05, self.manager.get_router("client").dispatch, [event]).start()
+        return type("Response", (), {"status_code": status, "text": "error"})()
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = server.SocketManager()
+    monkeypatch.setattr(server, "manager", manager)
+    monkeypatch.setattr(server, "connect_to_socket", lambda url: FakeSocket())
+    return manager
+
+
+def run(timeout=5):
+    return server.run_blue_node(GRAPH, "n1", "http://dispatcher", [1], "client", token="t", timeout=timeout)
+
+
+def test_waits_for_the_node_event(manager, monkeypatch):
+    session = GraphSession(manager, output=[42])
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    assert run() == [42]
+    assert len(session.posts) == 1
+
+
+def test_errors_are_retried(manager, monkeypatch):
+    session = GraphSession(manager, statuses=[500], output=[42])
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    assert run() == [42]
+    assert len(session.posts) == 2
+
+
+def test_timeouts_are_not_retried(manager, monkeypatch):
+    session = GraphSession(manager)
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    start = time.time()
+    with pytest.raises(server.TimeoutError):
+        run(timeout=0.3)
+    assert time.time() - start < 1
+    assert len(session.posts) == 1
+
+
+def test_retries_share_one_deadline(manager, monkeypatch):
+    session = GraphSession(manager, statuses=[500, 500])
+    original = server.run_blue_node
+    timeouts = []
+
+    def run_blue_node(*args, timeout, **kwargs):
+        timeouts.append(timeout)
+        time.sleep(0.1)
+        return original(*args, timeout=timeout, **kwargs)
+
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    monkeypatch.setattr(server, "run_blue_node", run_blue_node)
+    start = time.time()
+    with pytest.raises(server.TimeoutError):
+        server.run_blue_node(GRAPH, "n1", "http://dispatcher", [1], "client", token="t", timeout=0.5)
+    assert time.time() - start < 1
+    assert timeouts[0] == 0.5
+    assert all(later < earlier for earlier, later in zip(timeouts, timeouts[1:]))
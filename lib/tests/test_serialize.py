@@ -0,0 +1,78 @@
+import dataclasses
+import datetime
+
+import pytest
+
+from oloren import serialize
+from oloren.util import OutputFile
+
+
+def fake_type(module, name, **attrs):
+    return type(name, (), {"__module__": module, **attrs})
+
+
+Array = fake_type("numpy", "ndarray", tolist=lambda self: [1, 2, 3])
+DataFrame = fake_type(
+    "pandas.core.frame", "DataFrame", columns=["a"], to_dict=lambda self, orient: [{"a": 1}, {"a": 2}]
+)
+Timestamp = fake_type("pandas._libs.tslibs", "Timestamp", isoformat=lambda self: "2024-01-01T00:00:00")
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        if serialize.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(serialize, "orjson", None)
+    return request.param
+
+
+def test_round_trip(backend):
+    value = {"list": [1, 2.5, None, True], "nested": {"s": "é"}}
+    assert serialize.loads(serialize.dumps(value)) == value
+
+
+def test_default_conversions(backend):
+    value = {
+        "array": Array(),
+        "frame": DataFrame(),
+        "timestamp": Timestamp(),
+        "date": datetime.date(2024, 1, 2),
+        "set": {1},
+        "point": Point(1, 2),
+    }
+    assert serialize.loads(serialize.dumps(value)) == {
+        "array": [1, 2, 3],
+        "frame": [{"a": 1}, {"a": 2}],
+        "timestamp": "2024-01-01T00:00:00",
+        "date": "2024-01-02",
+        "set": [1],
+        "point": {"x": 1, "y": 2},
+    }
+
+
+def test_big_integers(backend):
+    assert serialize.loads(serialize.dumps([2**70])) == [2**70]
+
+
+def test_output_files_are_refused(backend):
+    with pytest.raises(TypeError):
+        serialize.dumps([OutputFile("out.txt")])
+
+
+def test_unknown_types_are_refused(backend):
+    with pytest.raises(TypeError):
+        serialize.dumps([object()])
+
+
+def test_set_serializer(monkeypatch):
+    monkeypatch.setattr(serialize, "serializer", serialize.serializer)
+    serialize.set_serializer(serialize.JSONSerializer(default=lambda obj: "custom"))
+    assert serialize.loads(serialize.dumps([object()])) == ["custom"]
@@ -0,0 +1,172 @@
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from oloren.wsgi import PooledWSGIServer
+
+
+def app(environ, start_response):
+    if environ["PATH_INFO"] == "/slow":
+        time.sleep(0.5)
+    body = environ["PATH_INFO"].encode()
+    start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", str(len(body)))])
+    return [body]
+
+
+@pytest.fixture
+def server():
+    server = PooledWSGIServer("127.0.0.1", 0, app, threads=2, keep_alive_timeout=0.5)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+
+
+def get(connection, path):
+    connection.request("GET", path)
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def receive_until(connection, end):
+    received = b""
+    while not received.endswith(end):
+        data = connection.recv(4096)
+        assert data, f"The connection was closed after {received!r}"
+        received += data
+    return received
+
+
+def test_idle_keep_alive_connections_do_not_hold_threads(server):
+    idle = [http.client.HTTPConnection("127.0.0.1", server.port, timeout=5) for _ in range(4)]
+    for connection in idle:
+        assert get(connection, "/") == (200, b"/")
+    assert all(connection.sock is not None for connection in idle)
+
+    start = time.time()
+    assert get(http.client.HTTPConnection("127.0.0.1", server.port, timeout=5), "/new") == (200, b"/new")
+    assert time.time() - start < 0.3
+    # The idle connections are still usable
+    assert get(idle[0], "/again") == (200, b"/again")
+
+
+def test_pipelined_requests(server):
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as connection:
+        connection.sendall(b"GET /a HTTP/1.1\r\nHost: x\r\n\r\nGET /b HTTP/1.1\r\nHost: x\r\n\r\n")
+        received = receive_until(connection, b"\r\n\r\n/b")
+        assert received.index(b"\r\n\r\n/a") < received.index(b"\r\n\r\n/b")
+
+
+def test_unread_request_bodies_are_discarded(server):
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as connection:
+        connection.sendall(
+            b"POST /a HTTP/1.1\r\nHost: x\r\nContent-Length: 5\r\n\r\nhello"
+            b"GET /b HTTP/1.1\r\nHost: x\r\n\r\n"
+        )
+        received = receive_until(connection, b"\r\n\r\n/b")
+        assert received.count(b"200 OK") == 2
+
+
+def test_idle_connections_are_closed_after_the_timeout(server):
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as connection:
+        connection.sendall(b"GET / HTTP/1.1\r\nHost: x\r\n\r\n")
+        received = receive_until(connection, b"\r\n\r\n/")
+        assert b"200 OK" in received
+        start = time.time()
+        assert connection.recv(4096) == b""
+        assert 0.3 < time.time() - start < 2
+
+
+def test_closing_finishes_requests_in_progress():
+    server = PooledWSGIServer("127.0.0.1", 0, app, threads=2)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    results = []
+    client = threading.Thread(
+        target=lambda: results.append(get(http.client.HTTPConnection("127.0.0.1", server.port, timeout=5), "/slow"))
+    )
+    client.start()
+    time.sleep(0.1)
+    server.shutdown()
+    thread.join()
+    client.join()
+    assert results == [(200, b"/slow")]
+
+
+EXTENSION = """
+import sys, time
+import oloren as olo
+
+@olo.register()
+def slow(x=olo.Num()):
+    time.sleep(1)
+    return x
+
+olo.run("drain", port=int(sys.argv[1]), server_mode="production", threads=2)
+"""
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.server.posts.append((self.path, self.rfile.read(int(self.headers["Content-Length"]))))
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_sigterm_drains_running_invocations(tmp_path):
+    dispatcher = ThreadingHTTPServer(("127.0.0.1", 0), RecordingHandler)
+    dispatcher.posts = []
+    threading.Thread(target=dispatcher.serve_forever, daemon=True).start()
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    lib = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "-c", EXTENSION, str(port)],
+        env={**os.environ, "PYTHONPATH": lib, "MODE": ""},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        body = {
+            "node": {"token": None, "data": [{"value": 7}]},
+            "inputs": [],
+            "id": "n1",
+            "uuid": "u1",
+            "dispatcherurl": f"http://127.0.0.1:{dispatcher.server_address[1]}",
+        }
+        deadline = time.time() + 30
+        while True:
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                connection.request("POST", "/operator/slow", json.dumps(body), {"Content-Type": "application/json"})
+                assert connection.getresponse().status == 200
+                break
+            except ConnectionRefusedError:
+                assert time.time() < deadline
+                time.sleep(0.1)
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(30) == 0
+    finally:
+        process.kill()
+        dispatcher.shutdown()
+    assert [(path, json.loads(data)) for path, data in dispatcher.posts if path == "/node_finished"] == [
+        ("/node_finished", {"node": "n1", "output": [7]})
+    ]
@@ -0,0 +1,76 @@
+import gzip
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from oloren import server
+
+
+class RecordingAdapter(BaseAdapter):
+    """Answers every request with ``status``, or 415 for compressed bodies if ``accepts_encoding`` is False."""
+
+    def __init__(self, accepts_encoding=True):
+        super().__init__()
+        self.accepts_encoding = accepts_encoding
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        encoded = "Content-Encoding" in request.headers
+        response.status_code = 415 if encoded and not self.accepts_encoding else 200
+        return response
+
+    def close(self):
+        pass
+
+
+def session_with(adapter, encoding):
+    session = server.DispatcherSession(request_encoding=encoding)
+    session.mount("http://dispatcher", adapter)
+    return session
+
+
+PAYLOAD = {"node": "n1", "output": ["x" * 10000]}
+
+
+def test_large_posts_are_compressed():
+    adapter = RecordingAdapter()
+    session = session_with(adapter, "gzip")
+    session.post("http://dispatcher/node_finished", json=PAYLOAD)
+    session.post("http://dispatcher/node_progress", json={"node": "n1"})
+
+    compressed, small = adapter.requests
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert int(compressed.headers["Content-Length"]) == len(compressed.body) < 1000
+    assert server.serialize.loads(gzip.decompress(compressed.body)) == PAYLOAD
+    assert "Content-Encoding" not in small.headers
+
+
+def test_uncompressed_by_default():
+    adapter = RecordingAdapter()
+    session_with(adapter, None).post("http://dispatcher/node_finished", json=PAYLOAD)
+    assert "Content-Encoding" not in adapter.requests[0].headers
+
+
+def test_415_falls_back_to_uncompressed():
+    adapter = RecordingAdapter(accepts_encoding=False)
+    session = session_with(adapter, "gzip")
+
+    assert session.post("http://dispatcher/node_finished", json=PAYLOAD).status_code == 200
+    assert session.post("http://dispatcher/node_finished", json=PAYLOAD).status_code == 200
+
+    first, retry, second = adapter.requests
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in retry.headers
+    assert server.serialize.loads(retry.body) == PAYLOAD
+    assert "Content-Encoding" not in second.headers
+    assert session.uncompressed_hosts == {"dispatcher"}
+
+
+def test_invalid_encoding():
+    with pytest.raises(ValueError):
+        server.DispatcherSession(request_encoding="br")
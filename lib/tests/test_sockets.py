@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+import oloren as olo
+from oloren import server
+
+
+class FakeSocket:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def emit(self, event, data=None, callback=None):
+        if callback is not None:
+            callback()
+
+
+def test_slow_connect_does_not_block_other_clients(monkeypatch):
+    slow_started = threading.Event()
+    release = threading.Event()
+
+    def connect_to_socket(dispatcher_url):
+        if dispatcher_url == "slow":
+            slow_started.set()
+            release.wait(5)
+        return FakeSocket()
+
+    monkeypatch.setattr(server, "connect_to_socket", connect_to_socket)
+    manager = server.SocketManager()
+    slow = threading.Thread(target=manager.get_connection, args=("a", "slow", "n1"))
+    slow.start()
+    assert slow_started.wait(5)
+
+    start = time.time()
+    manager.get_connection("b", "fast", "n2")
+    manager.get_router("a")
+    assert time.time() - start < 1
+    release.set()
+    slow.join()
+    assert set(manager.connections) == {"a", "b"}
+
+
+def test_graph_router_dispatches_by_graph_id():
+    router = server.GraphRouter()
+    received = []
+    router.register("u-graph", received.append)
+    router.dispatch({"data": {"id": "u-graph"}})
+    router.dispatch({"data": {"id": "other-graph"}})
+    router.unregister("u-graph")
+    router.dispatch({"data": {"id": "u-graph"}})
+    assert received == [{"data": {"id": "u-graph"}}]
+
+
+def test_connection_closed_after_last_holder(monkeypatch):
+    sockets = []
+
+    class ClosableSocket(FakeSocket):
+        closed = False
+
+        def disconnect(self):
+            self.closed = True
+
+    monkeypatch.setattr(server, "connect_to_socket", lambda url: sockets.append(ClosableSocket()) or sockets[-1])
+    manager = server.SocketManager()
+    with manager.holding("a"):
+        with manager.holding("a"):
+            manager.get_connection("a", "url", "n1")
+        assert not sockets[0].closed
+    assert sockets[0].closed
+    assert manager.connections == {} and manager.routers == {} and manager.holders == {}
+
+
+def test_execute_function_releases_its_connection(monkeypatch):
+    monkeypatch.setattr(server, "post_outputs", lambda dispatcher_url, body, outputs: None)
+    monkeypatch.setattr(server, "connect_to_socket", lambda url: FakeSocket())
+    monkeypatch.setattr(FakeSocket, "disconnect", lambda self: None, raising=False)
+
+    @olo.register()
+    def connects(x=olo.Num()):
+        server.manager.get_connection("invocation", "url", "n1")
+        return x
+
+    body = {"node": {"token": None, "data": [{"value": 1}]}, "inputs": [], "id": "n1", "uuid": "invocation"}
+    server.execute_function("http://127.0.0.1:9", body, "connects")
+    assert "invocation" not in server.manager.connections
+
+
+def test_callers_wait_for_the_connection_to_be_acknowledged(monkeypatch):
+    order = []
+    acks = []
+
+    class DelayedAckSocket(FakeSocket):
+        def emit(self, event, data=None, callback=None):
+            acks.append(callback)
+
+    monkeypatch.setattr(server, "connect_to_socket", lambda url: DelayedAckSocket())
+    manager = server.SocketManager()
+    first = threading.Thread(
+        target=manager.get_connection, args=("a", "url", "n1", lambda uuid: order.append("run_graph A"))
+    )
+    second = threading.Thread(
+        target=manager.get_connection, args=("a", "url", "n1", lambda uuid: order.append("run_graph B"))
+    )
+    first.start()
+    first.join()
+    second.start()
+    time.sleep(0.2)
+    assert order == []
+
+    order.append("ack")
+    acks[0]()
+    second.join(5)
+    assert order == ["ack", "run_graph A", "run_graph B"]
+
+
+def test_waiting_for_the_acknowledgement_times_out(monkeypatch):
+    class UnacknowledgedSocket(FakeSocket):
+        def emit(self, event, data=None, callback=None):
+            pass
+
+    monkeypatch.setattr(server, "connect_to_socket", lambda url: UnacknowledgedSocket())
+    manager = server.SocketManager()
+    manager.get_connection("a", "url", "n1", lambda uuid: None)
+    with pytest.raises(server.TimeoutError):
+        manager.get_connection("a", "url", "n1", lambda uuid: None, timeout=0.1)
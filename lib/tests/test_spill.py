@@ -0,0 +1,61 @@
+import email
+import shutil
+
+from oloren import server
+
+
+class RecordingSession:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, data=None, headers=None, **kwargs):
+        body = data.read() if hasattr(data, "read") else data
+        self.posts.append((url, headers, body))
+        return type("Response", (), {"status_code": 200, "text": "ok"})()
+
+
+def multipart_parts(headers, body):
+    message = email.message_from_bytes(b"Content-Type: " + headers["Content-Type"].encode() + b"\r\n\r\n" + body)
+    return {
+        part.get_param("name", header="content-disposition"): (part.get_filename(), part.get_payload(decode=True))
+        for part in message.get_payload()
+    }
+
+
+def test_outputs_are_inline_by_default(monkeypatch):
+    session = RecordingSession()
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    server.post_outputs("http://dispatcher", {"id": "n1"}, [list(range(10000))])
+    url, _, body = session.posts[0]
+    assert url == "http://dispatcher/node_finished"
+    assert server.serialize.loads(body) == {"node": "n1", "output": [list(range(10000))]}
+
+
+def test_spilled_output_round_trip(monkeypatch, tmp_path):
+    session = RecordingSession()
+    monkeypatch.setattr(server, "get_session", lambda: session)
+    monkeypatch.setattr(server, "SPILL_THRESHOLD", 1000)
+    big = [{"i": i} for i in range(1000)]
+    server.post_outputs("http://dispatcher", {"id": "n1"}, [big, "small"])
+
+    url, headers, body = session.posts[0]
+    assert url == "http://dispatcher/node_finished_file"
+    parts = multipart_parts(headers, body)
+    assert server.serialize.loads(parts["output"][1]) == ["", "small"]
+    filename, spilled = parts["0"]
+    assert filename.endswith(server.SPILL_SUFFIX)
+
+    # Downstream, the dispatcher hands the file back as a record with a signed URL
+    (tmp_path / filename).write_bytes(spilled)
+
+    def download_input(record):
+        copy = str(tmp_path / "download")
+        shutil.copyfile(tmp_path / filename, copy)
+        return copy
+
+    monkeypatch.setattr(server, "download_input", download_input)
+    record = {"url": f"https://bucket/{filename}?signature=x"}
+    assert server.is_spilled_output(record)
+    assert not server.is_spilled_output({"url": "https://bucket/data.json"})
+    assert server.decode_spilled_outputs([record, "small"]) == [big, "small"]
+    assert server.decode_spilled_outputs(record) == big
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import oloren as olo
+from oloren import server
+
+
+@pytest.fixture(autouse=True)
+def warm_state(monkeypatch):
+    monkeypatch.setattr(server, "_WARM_STATE", {})
+
+
+@pytest.fixture
+def pool():
+    pool = server.WorkerPool()
+    yield pool
+    pool.shutdown()
+
+
+def record_setup(directory):
+    with open(os.path.join(directory, str(os.getpid())), "a") as file:
+        file.write("setup\n")
+    return {"pid": os.getpid()}
+
+
+def call_registered(name):
+    return server.FUNCTIONS[name][0](log_message=None)
+
+
+def record_state(name, path):
+    with open(path, "a") as file:
+        file.write(f"{call_registered(name)['pid']}\n")
+
+
+def test_state_is_set_up_once_and_passed_in(tmp_path):
+    @olo.register(setup=lambda: record_setup(tmp_path))
+    def with_state(state=None):
+        return state
+
+    @olo.register(setup=lambda: record_setup(tmp_path / "other"))
+    def without_state():
+        return "ok"
+
+    (tmp_path / "other").mkdir()
+    assert call_registered("with_state") is call_registered("with_state")
+    assert call_registered("with_state") == {"pid": os.getpid()}
+    assert (tmp_path / str(os.getpid())).read_text() == "setup\n"
+    assert call_registered("without_state") == "ok"
+    assert (tmp_path / "other" / str(os.getpid())).read_text() == "setup\n"
+
+
+@pytest.mark.parametrize("preload", [True, False])
+def test_pool_workers_share_preloaded_state(pool, tmp_path, preload):
+    @olo.register(setup=lambda: record_setup(tmp_path))
+    def preloaded(state=None):
+        return state
+
+    if preload:
+        server.load_warm_states()
+    pool.configure(2, initializer=None if preload else server.load_warm_states)
+    states = tmp_path / "states"
+    for future in [pool.submit(record_state, "preloaded", str(states)) for _ in range(4)]:
+        future.result(timeout=10)
+
+    setup_pids = sorted(int(name) for name in os.listdir(tmp_path) if name != "states")
+    if preload:
+        # Set up once before forking, and inherited by both workers
+        assert setup_pids == [os.getpid()]
+    else:
+        assert len(setup_pids) == 2 and os.getpid() not in setup_pids
+    assert {int(pid) for pid in states.read_text().split()} <= set(setup_pids)
+
+
+def test_teardown_runs_once_in_the_process_that_ran_setup(tmp_path):
+    script = """
+import multiprocessing, os, sys
+import oloren as olo
+from oloren import server
+
+@olo.register(setup=lambda: os.getpid(), teardown=lambda state: print("teardown", state, os.getpid(), flush=True))
+def warm(state=None):
+    return state
+
+server.load_warm_states()
+child = multiprocessing.Process(target=server.get_warm_state, args=("warm",))
+child.start()
+child.join()
+print("parent", os.getpid(), flush=True)
+"""
+    lib = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": lib}
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, env=env)
+    lines = [line for line in result.stdout.splitlines() if line.startswith(("teardown", "parent"))]
+    pid = lines[0].split()[1]
+    assert lines == [f"parent {pid}", f"teardown {pid} {pid}"]
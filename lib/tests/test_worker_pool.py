@@ -0,0 +1,92 @@
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from oloren import server
+
+
+def touch(directory, name):
+    with open(os.path.join(directory, name), "w"):
+        pass
+
+
+def crash():
+    os._exit(1)
+
+
+@pytest.fixture
+def pool():
+    pool = server.WorkerPool()
+    yield pool
+    pool.shutdown()
+
+
+def test_workers_are_started_when_configured(pool, tmp_path):
+    pool.configure(2, initializer=lambda: touch(tmp_path, str(os.getpid())))
+    # Every worker has run its initializer before the first submission
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_pool_runs_invocations_on_its_workers(pool, tmp_path):
+    pool.configure(2)
+    futures = [pool.submit(touch, str(tmp_path), str(i)) for i in range(6)]
+    for future in futures:
+        future.result(timeout=10)
+    assert sorted(os.listdir(tmp_path)) == [str(i) for i in range(6)]
+    assert pool.stats()["completed"] == 6
+
+
+def test_pool_is_rebuilt_after_a_worker_dies(pool, tmp_path):
+    pool.configure(1)
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(crash).result(timeout=10)
+    pool.submit(touch, str(tmp_path), "after").result(timeout=10)
+    assert os.listdir(tmp_path) == ["after"]
+
+
+def test_finished_processes_are_reaped(pool, tmp_path):
+    pool.configure(max_in_flight=1)
+    process = pool.submit(touch, str(tmp_path), "first")
+    process.join(10)
+    assert process.exitcode == 0
+    assert pool.stats()["in_flight"] == 0
+    # The finished process no longer counts against max_in_flight
+    pool.submit(touch, str(tmp_path), "second").join(10)
+    assert sorted(os.listdir(tmp_path)) == ["first", "second"]
+
+
+def test_submissions_over_the_limit_are_rejected(pool):
+    pool.configure(max_in_flight=1)
+    pool.submit(time.sleep, 1)
+    with pytest.raises(server.WorkerPoolFull):
+        pool.submit(time.sleep, 1)
+
+
+def wait_for_completed(pool, n, timeout=10):
+    deadline = time.time() + timeout
+    while pool.stats()["completed"] < n:
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_process_run_times_are_recorded(pool):
+    pool.configure()
+    assert pool.retry_after() == 1
+    pool.submit(time.sleep, 1.2)
+    wait_for_completed(pool, 1)
+    assert pool.stats()["avg_run_seconds"] >= 1.2
+    assert pool.retry_after() == 2
+
+
+def test_configure_resets_stats(pool):
+    pool.configure(max_in_flight=0)
+    with pytest.raises(server.WorkerPoolFull):
+        pool.submit(time.sleep, 0)
+    pool.configure()
+    pool.submit(time.sleep, 0)
+    wait_for_completed(pool, 1)
+    pool.configure()
+    stats = pool.stats()
+    assert (stats["completed"], stats["rejected"], stats["avg_run_seconds"]) == (0, 0, 0)
@@ -0,0 +1,92 @@
+import gzip
+import json
+
+import pytest
+
+from oloren import server, wsgi
+
+BODY = {"node": {}, "inputs": ["x" * 10000], "id": "n1", "dispatcherurl": "http://dispatcher"}
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    calls = []
+    monkeypatch.setattr(wsgi.worker_pool, "submit", lambda fn, *args: calls.append(args))
+    return calls
+
+
+@pytest.fixture
+def client():
+    return wsgi.app.test_client()
+
+
+def post(client, data, encoding=None, content_type="application/json"):
+    headers = {"Content-Encoding": encoding} if encoding else {}
+    return client.post("/operator/head", data=data, headers=headers, content_type=content_type)
+
+
+def test_uncompressed_body(client, submitted):
+    response = post(client, json.dumps(BODY))
+    assert response.status_code == 200
+    assert submitted == [("http://dispatcher", BODY, "head")]
+    assert "gzip" in response.headers["Accept-Encoding"]
+
+
+def test_gzip_body(client, submitted):
+    response = post(client, gzip.compress(json.dumps(BODY).encode()), "gzip")
+    assert response.status_code == 200
+    assert submitted == [("http://dispatcher", BODY, "head")]
+
+
+def test_zstd_body(client, submitted):
+    if server.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    response = post(client, server.compress(json.dumps(BODY).encode(), "zstd"), "zstd")
+    assert response.status_code == 200
+    assert submitted == [("http://dispatcher", BODY, "head")]
+
+
+def test_unsupported_encoding(client, submitted):
+    assert post(client, json.dumps(BODY), "compress").status_code == 415
+    assert post(client, "node=1", content_type="application/x-www-form-urlencoded").status_code == 415
+    assert submitted == []
+
+
+def test_corrupt_body(client, submitted):
+    assert post(client, b"not gzip", "gzip").status_code == 400
+    assert post(client, gzip.compress(json.dumps(BODY).encode())[:-10], "gzip").status_code == 400
+    assert submitted == []
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_decompression_bomb(client, submitted, monkeypatch, encoding):
+    if encoding == "zstd" and server.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    monkeypatch.setitem(wsgi.app.config, "MAX_CONTENT_LENGTH", 1024 * 1024)
+    bomb = server.compress(b"[" + b" " * (10 * 1024 * 1024) + b"]", encoding)
+    assert len(bomb) < 1024 * 1024
+    assert post(client, bomb, encoding).status_code == 413
+    assert submitted == []
+
+
+@pytest.fixture
+def full_pool():
+    wsgi.worker_pool.configure(max_in_flight=0)
+    wsgi.worker_pool.runs.append(2.5)
+    yield wsgi.worker_pool
+    wsgi.worker_pool.configure()
+
+
+def test_full_pool_rejects_with_retry_after(client, full_pool):
+    response = post(client, json.dumps(BODY))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert response.json["rejected"] == 1
+
+
+def test_stats(client, full_pool):
+    post(client, json.dumps(BODY))
+    stats = client.get("/stats").json
+    assert stats["rejected"] == 1
+    assert stats["max_in_flight"] == 0
+    assert stats["in_flight"] == 0 and stats["queued"] == 0